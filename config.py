@@ -1,7 +1,21 @@
 #####
 ##### Prediction input/output file names #####
 N_PARALLEL_JOBS = 16 # set num cores for multi-processing..more the better
+N_TORCH_THREADS = 1  # torch threads per packing process for RL predictions, keeps N_PARALLEL_JOBS processes from oversubscribing cores
 ITEM_MASTER_FILE = "./Data/ItemMaster.xlsx" # needed for Item Dimensions info for customer order
+USE_PACKING_CACHE = True # reuse results of earlier orders with the same items, see packing_cache.py
+PACKING_CACHE_FILE = "./packing_cache.sqlite"
+PACKING_CACHE_MAX_ORDERS = 100000 # least recently used orders beyond this get evicted
+PACKING_CACHE_VERSION = 1 # bump to drop all cached results, a retrained or re-exported RL model does so by itself
+ORDER_READ_CHUNK_ROWS = 100000 # rows of a csv/parquet/jsonl order file read at a time, see order_reader.py
+ORDERS_PER_TASK = 8 # orders sent to a packing process at a time
+ORDER_PRE_DISPATCH = 4 # tasks of ORDERS_PER_TASK orders per packing process read ahead of the packing
+SERVICE_HOST = "127.0.0.1" # pack_service.py, use 0.0.0.0 to serve other machines
+SERVICE_PORT = 5000
+ORDER_LATENCY_BUDGET = None # default seconds per order of pack_scheduler.py, None to always finish RL packing
+ORDER_DEADLINE_GRACE = 0.5 # seconds RL packing gets past an order's deadline to hand back the heuristic packing
+RESULTS_FORMAT = "xlsx" # results file of predict.py: xlsx | csv | parquet, see result_writer.py
+RESULTS_CHUNK_ORDERS = 1000 # orders per write of predict.py --stream_results
 ##### Prediction input/output file names #####
 #####
 
@@ -10,6 +24,12 @@ ITEM_MASTER_FILE = "./Data/ItemMaster.xlsx" # needed for Item Dimensions info fo
 ##### Some thresholds for faster results
 min_supported_corners = 3 # eg how many corners need to be directly supported from below.. 2 less stable but may be more tight
 rl_threshold_num_containers = 6 # when to use RL over heuristic
+rl_max_items = 20 # larger orders are left to the heuristic, RL takes ~0.25-1s/item with simulation_times simulations
+rl_time_budget = None # seconds of MCTS per order instead of simulation_times per item, see mcts.monteCarlo.SearchBudget
+rl_max_items_budgeted = 60 # larger orders are left to the heuristic when RL runs on a time budget or deadline
+single_sku_heuristic = True # closed form packing for orders of a single item type, see PackHeuristic.pack_single_sku
+heuristic_corner_priority = "insertion" # order the heuristic tries free corners in: insertion | lowest_z, see pack_env/extreme_points.py
+heuristic_drop_covered_corners = False # True: never try corners inside placed boxes, avoids overlaps the height map misses but changes many packings (some use more containers)
 #####
 
 
@@ -19,6 +39,7 @@ rl_threshold_num_containers = 6 # when to use RL over heuristic
 save_dir  = './train/save_dir/' 
 epoch_dir = './train/epochs_dir/'
 save_model_name = "model.pt"
+frozen_model_name = "model_frozen.pt" # inference only TorchScript export of save_model_name, see export_model.py
 ##### RL model paths #####
 #####
 
@@ -60,6 +81,11 @@ obs_len = container_hwv_maps_len + current_looakhead_items_len + obs_mask_len
 channel = num_containers*3 +  5 + num_containers*num_rotations + 2
 pred_mask_len = act_len
 
+# compact observation: (height maps, scalars) instead of the constant planes above, CNNPro broadcasts scalars & mask itself
+compact_obs = False
+map_channel = num_containers # height_map per container
+num_scalars = num_containers*2 + 5 + 2 # free_weight & free_volume per container, current box, remaining boxes
+
 actor_hidden = 100
 critic_hidden = 100
 use_container_ids = [-1]
@@ -77,6 +103,13 @@ num_testEpisodes  = 30
 
 search_depth     = max(1, num_items)
 simulation_times = 3
+leaf_batch_size  = 1 # MCTS leaves evaluated together in one batched forward pass (virtual loss spreads them), raise along with simulation_times
+mcts_max_simulations = 200 # per item, when searching on a time budget
+mcts_early_bias = 2.0 # >1 gives early items (most choices left) more of an order's time budget
+mcts_node_type = "object" # object: a MCTSNode per legal action | array: children statistics in NumPy arrays, vectorized selection (ties within rtol of the best instead of the running maximum, so it can pick another child)
+mcts_transposition_size = 0 # >0: packing states whose evaluation & statistics MCTS shares across action orders (changes search statistics), 0 to disable
+mcts_root_workers = 1 # >1: processes searching independent trees per item for an order packed outside the multi-processing pool, at most simulation_times // 2, see mcts/parallel.py
+mcts_worker_start_method = "spawn"
 gamma = 1 # discount factor for rewards (default: 1)
 
 batch_size = 32
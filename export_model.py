@@ -0,0 +1,19 @@
+import argparse
+
+import config
+
+from model_arch.model import NNetWrapper
+from model_arch.net import CNNPro
+
+
+if __name__=="__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--quantize', action='store_true', help='dynamic int8 quantization of the actor Linear layers')
+
+	args = parser.parse_args()
+
+	model = NNetWrapper(CNNPro())
+	model.load_checkpoint(folder=config.epoch_dir, filename=config.save_model_name)
+	filepath = model.save_frozen(folder=config.epoch_dir, filename=config.frozen_model_name, quantize=args.quantize)
+	print("saved frozen model to", filepath, "; use with predict.py --frozen_model")
@@ -1,22 +1,69 @@
-import copy, time
+import time, math, hashlib
 import numpy as np
 import sys
+from collections import OrderedDict
 
-from .node import MCTSNode
+from .node import MCTSNode, ArrayNode, TranspositionEntry
 
 sys.path.append("../")
 import config
 
+def state_key(env):
+    """
+    hash of what determines a packing state: height map, free weight & volume of each container the order can use,
+    the number of containers used, the current box & the boxes left to pack as a multiset (PackEnv.box_types & remaining_counts),
+    so the order they come in doesn't matter; the model's input & legal actions follow from these
+    """
+    h = hashlib.blake2b(digest_size=16)
+    container_sets = env.container_sets_status
+    for container_id in env.init_container_ids_list:
+        container = container_sets.containers[container_id]
+        h.update(np.ascontiguousarray(container.height_map).data)
+        h.update(np.array([container.free_wt, container.free_vol]).tobytes())
+    h.update(np.int64(len(container_sets.container_placedBox_lookUp)).tobytes())
+    box = env.current_box
+    h.update(np.array([box.dx, box.dy, box.dz, box.wt], dtype=np.float64).tobytes())
+    h.update(env.box_types.tobytes())
+    h.update(env.remaining_counts.tobytes())
+    return h.digest()
+
+
 def softmax(x):
     probs = np.exp(x - np.max(x))
     probs /= np.sum(probs)
     return probs
 
 
+class SearchBudget(object):
+    """
+    wall-clock budget of packing one order with MCTS, shared out over its items as they come:
+    an item's share grows with its branching factor (#legal actions) & is front-loaded by config.mcts_early_bias,
+    the last item gets whatever is left
+    """
+    def __init__(self, seconds, num_items):
+        self.deadline = time.time() + seconds
+        self.items_left = num_items
+        self.weight_sum = 0.
+        self.num_weights = 0
+
+    def remaining(self):
+        return max(0., self.deadline - time.time())
+
+    def item_seconds(self, num_legal):
+        weight = math.sqrt(max(1, num_legal))
+        self.weight_sum += weight
+        self.num_weights += 1
+        mean_weight = self.weight_sum / self.num_weights # estimate for the items still to come
+
+        share = weight / (weight + (self.items_left - 1) * mean_weight)
+        self.items_left = max(1, self.items_left - 1)
+        return self.remaining() * min(1., config.mcts_early_bias * share)
+
+
 class MCTree(object):
     def __init__(self, model, environment, search_depth=None, credit=1):        
         self.sim_env = environment
-        self.root = MCTSNode(None, 1.0)
+        self.root = (ArrayNode if config.mcts_node_type == "array" else MCTSNode)(None, 1.0)
         self.model = model
 
         self.rollout_length = -1
@@ -26,6 +73,13 @@ class MCTree(object):
         self.subrt = 0
         self.reached_depth = -1
 
+        # state key => TranspositionEntry, so states reached by different action orders share evaluation & statistics
+        self.table = OrderedDict() if config.mcts_transposition_size > 0 else None
+        self.table_hits = 0
+
+        self.actions_taken = [] # actions of the real packing so far, see succeed
+        self.best_packing = None # (num_containers, actions) of the best complete packing any simulation reached
+
         if search_depth is not None:
             self.max_depth = search_depth
         else:
@@ -33,70 +87,163 @@ class MCTree(object):
 
 
     def tree_policy(self, check_print=False):
+        leaf_node, value, _ = self.descend(check_print)
+        self.backup(leaf_node, value)
+
+    def tree_policy_batch(self, num_leaves, check_print=False):
+        '''
+        num_leaves simulations sharing one batched model evaluation of their leaves
+        virtual loss on each visited path steers the next descents of the batch to other leaves
+        '''
+        paths = []
+        pending = {} # unexpanded leaf => (obs, mask) to evaluate, same leaf reached twice gets evaluated once
+        for i in range(num_leaves):
+            leaf_node, value, leaf_input = self.descend(check_print, virtual_loss=1, evaluate=False)
+            if leaf_input is not None and leaf_node not in pending:
+                pending[leaf_node] = leaf_input
+            paths.append((leaf_node, value))
+
+        if len(pending) > 0:
+            start = time.time()
+            leaf_nodes = list(pending.keys())
+            obs   = self.sim_env.stack_observations([pending[node][0] for node in leaf_nodes])
+            masks = np.stack([pending[node][1] for node in leaf_nodes])
+            _, policies, _, values = self.model.predict_batch(obs, masks)
+            for i, node in enumerate(leaf_nodes):
+                node.expand_with(policies[i], values[i], pending[node][1], self.credit)
+                self.share_state(node, pending[node][2])
+            if check_print:
+                print("\t\tbatched expand of {} leaves took".format(len(leaf_nodes)), time.time() - start)
+
+        for leaf_node, value in paths:
+            self.revert_virtual_loss(leaf_node, 1)
+            if value is None:
+                value = leaf_node.value
+            self.backup(leaf_node, value)
+
+    def descend(self, check_print=False, virtual_loss=0, evaluate=True):
+        '''
+        walk down from root with tree policy simulating the actions on sim_env (restored afterwards)
+        evaluate=True : expand the reached leaf with the model right away, return (leaf_node, value, None)
+        evaluate=False: keep it unexpanded, return (leaf_node, None, (obs, mask)) for a batched evaluation
+        virtual_loss is added to every node on the path, see tree_policy_batch
+        '''
         cur_node = self.root
         cur_depth = 0
-        sim2_env = copy.deepcopy(self.sim_env)
+        sim2_env = self.sim_env
+        env_state = sim2_env.snapshot() # simulate on the env itself & undo afterwards, much cheaper than copy.deepcopy(self.sim_env)
+        leaf_input = None
+        path_actions = []
+        if virtual_loss:
+            cur_node.add_virtual_loss(virtual_loss)
 
-        while True:
-            # Terminated: back up
-            if cur_node.is_terminated():
-                # without future
-                value = 0
-                break
+        try:
+            while True:
+                # Terminated: back up
+                if cur_node.is_terminated():
+                    # without future
+                    value = 0
+                    break
 
-            # Not Expanded: expand node
-            if not cur_node.is_expanded():
-                start = time.time()
-                pointer = cur_depth
-                cur_node.expand(model=self.model,
-                                credit=self.credit,
-                                sim_env=sim2_env,
-                                check_print=check_print)
+                # Not Expanded: expand node
+                if not cur_node.is_expanded():
+                    key = None
+                    if self.table is not None:
+                        key = state_key(sim2_env)
+                        if self.share_state(cur_node, key):
+                            value = cur_node.value
+                            break
 
-                if check_print:
-                    print("\t\texpand took", time.time() - start)
+                    if not evaluate:
+                        leaf_input = (sim2_env.observation(), sim2_env.current_box_mask.copy(), key)
+                        value = None
+                        break
 
-                value = cur_node.value
-                break
-            # reached max depth: back up
-            if cur_depth == self.max_depth:
-                value = cur_node.value
-                break
+                    start = time.time()
+                    pointer = cur_depth
+                    cur_node.expand(model=self.model,
+                                    credit=self.credit,
+                                    sim_env=sim2_env,
+                                    check_print=check_print)
+
+                    if check_print:
+                        print("\t\texpand took", time.time() - start)
+
+                    self.share_state(cur_node, key)
+                    value = cur_node.value
+                    break
+                # reached max depth: back up
+                if cur_depth == self.max_depth:
+                    value = cur_node.value
+                    break
             
-            # not leaf node: use tree policy
-            start = time.time()
-            cur_action, next_node = cur_node.choose_best(self.c)
-            if check_print:
-                print("\t\tchoose best took", time.time() - start, cur_action)
+                # not leaf node: use tree policy
+                start = time.time()
+                cur_action, next_node = cur_node.choose_best(self.c)
+                if virtual_loss:
+                    next_node.add_virtual_loss(virtual_loss)
+                if check_print:
+                    print("\t\tchoose best took", time.time() - start, cur_action)
 
 
-            # Simulate time: take the action
-            start = time.time()
-            action_idx = cur_action
-            reward, done, _ = sim2_env.step(action_idx)
-            if check_print:
-                print("\t\taction step took", time.time() - start)
+                # Simulate time: take the action
+                start = time.time()
+                action_idx = cur_action
+                reward, done, _ = sim2_env.step(action_idx)
+                path_actions.append(action_idx)
+                if check_print:
+                    print("\t\taction step took", time.time() - start)
                 
-            if check_print:
-                print("\n\t\t\tselected", currentBox)
+                if check_print:
+                    print("\n\t\t\tselected", sim2_env.current_box)
 
-            next_node.reward = reward
-            if done:
-                self.subrt += 1
-                if not next_node.is_terminated():
-                    next_node.terminate()
+                next_node.reward = reward
+                if done:
+                    if reward > 0: # all boxes packed
+                        self.record_packing(len(sim2_env.container_sets_status.container_placedBox_lookUp), path_actions)
+                    self.subrt += 1
+                    if not next_node.is_terminated():
+                        next_node.terminate()
+                    cur_node = next_node
+                    value = 0
+                    break
                 cur_node = next_node
-                value = 0
-                break
-            cur_node = next_node
-            cur_depth += 1
-
+                cur_depth += 1
+        finally:
+            sim2_env.restore(env_state)
 
         if cur_depth > self.reached_depth:
             self.reached_depth = cur_depth
-        start = time.time()
-        self.backup(cur_node, value)
-        # print("\tbackup took", time.time() - start)
+        return cur_node, value, leaf_input
+
+    def share_state(self, node, key):
+        """
+        node of state key gets the TranspositionEntry of the state:
+        unexpanded node gets expanded from a known entry (returns True), expanded one starts a new entry
+        """
+        if key is None:
+            return False
+
+        entry = self.table.get(key)
+        if entry is not None:
+            self.table.move_to_end(key)
+            node.entry = entry
+            if not node.is_expanded():
+                node.expand_from(entry.actions, entry.priors, entry.value)
+                self.table_hits += 1
+                return True
+            return False
+
+        if node.is_expanded():
+            node.entry = TranspositionEntry(*node.legal_priors(), node.value)
+            self.table[key] = node.entry
+            if len(self.table) > config.mcts_transposition_size:
+                self.table.popitem(last=False) # least recently reached state
+        return False
+
+    def record_packing(self, num_containers, path_actions):
+        if self.best_packing is None or num_containers < self.best_packing[0]:
+            self.best_packing = (num_containers, self.actions_taken + [int(a) for a in path_actions])
 
     def backup(self, leaf_node, value, gamma=1):
         cur_node = leaf_node
@@ -109,28 +256,51 @@ class MCTree(object):
             break
 
 
-    def select_action(self, sim_times, check_print=False, print_sim = False):
+    def revert_virtual_loss(self, leaf_node, virtual_loss):
+        cur_node = leaf_node
+        while cur_node is not None:
+            cur_node.revert_virtual_loss(virtual_loss)
+            cur_node = cur_node.prev_node
+
+
+    def select_action(self, sim_times, check_print=False, print_sim = False, time_budget=None):
+        """
+        time_budget: seconds to search instead of sim_times simulations (at least 1, at most config.mcts_max_simulations)
+        """
         check_print = not True
         print_sim = not True
 
         if check_print:
             print("\n**Selecting action for:", self.sim_env.current_box_id, self.sim_env.current_box.name)
         
-        start1 = time.clock()
-        for i in range(sim_times):
+        start1 = time.time()
+        leaf_batch_size = max(1, config.leaf_batch_size)
+        if time_budget is not None:
+            end_time = start1 + time_budget
+            sim_times = config.mcts_max_simulations
+
+        i = 0
+        while i < sim_times:
+            if time_budget is not None and i > 0 and time.time() >= end_time:
+                break
             start = time.time()
+            num_leaves = min(leaf_batch_size, sim_times - i)
 
             if check_print and print_sim:
                 print('\tsimulation',i+1)
 
-            self.tree_policy(check_print)
+            if num_leaves == 1:
+                self.tree_policy(check_print)
+            else:
+                self.tree_policy_batch(num_leaves, check_print)
 
             if check_print and print_sim:
-                print("\tsimulation:", i+1, "finished in =>", time.time() - start)
+                print("\tsimulation:", i+num_leaves, "finished in =>", time.time() - start)
+            i += num_leaves
 
         selcted_actionID, _ = self.root.choose_best(self.c)
 
-        end = time.clock()
+        end = time.time()
         # print("terminated node:", self.subrt)
         # print('reached depth:', self.reached_depth)
         # print('cost time', end-start1)   
@@ -140,11 +310,10 @@ class MCTree(object):
 
     def succeed(self, put_action):
         put_action = int(put_action)
-        new_node = self.root.next_nodes.get(put_action)
+        new_node = self.root.child_for_action(put_action)
         assert new_node is not None
-        new_node.p = 1.0
-        new_node.prev_node = None
+        self.actions_taken.append(put_action)
+        new_node.make_root()
         self.root = new_node
-        self.root.next_nodes = {}
         self.reached_depth = -1
         self.subrt = 0
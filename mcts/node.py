@@ -1,9 +1,22 @@
 import numpy as np
 import math, copy, time
-from joblib import Parallel, delayed, parallel_backend
 
 INF = 1e9+7
 
+class TranspositionEntry:
+    """
+    evaluation & visit statistics of one packing state, shared by all nodes reaching it, see MCTree.table
+    """
+    __slots__ = ("actions", "priors", "value", "n", "w")
+
+    def __init__(self, actions, priors, value):
+        self.actions = actions
+        self.priors = priors
+        self.value = value
+        self.n = 0
+        self.w = 0
+
+
 class Node:
     def __init__(self, prev, p):
         self.prev_node = prev
@@ -17,6 +30,9 @@ class Node:
         self.n = 0
         self.p = p
 
+        self.entry = None # TranspositionEntry shared with nodes of the same state, see MCTree.descend
+        self.virtual_loss = 0
+
     def is_expanded(self):
         return len(self.next_nodes) > 0
 
@@ -34,11 +50,31 @@ class Node:
         self.q = self.w / self.n
         # moving average
 
+        if self.entry is not None:
+            self.entry.n += 1
+            self.entry.w += value
+
+    def add_virtual_loss(self, loss):
+        # count as visited with a lost outcome until the real value is backed up
+        self.n += loss
+        self.w -= loss
+        self.q = self.w / self.n
+        self.virtual_loss += loss
+
+    def revert_virtual_loss(self, loss):
+        self.n -= loss
+        self.w += loss
+        self.q = self.w / self.n if self.n > 0 else 0
+        self.virtual_loss -= loss
+
     def get_u_value(self):
         u_value = self.p * np.sqrt(self.prev_node.n)/(self.n+1)
         return u_value
 
     def get_q_value(self):
+        if self.entry is not None and self.entry.n > 0:
+            # mean over every node of this state, with this node's pending virtual loss
+            return (self.entry.w - self.virtual_loss) / (self.entry.n + self.virtual_loss)
         return self.q
 
     def choose_best(self, c=1):
@@ -76,6 +112,23 @@ class Node:
         return (a_n[-1][1], a_n[-1][2])
 
 
+    def child_for_action(self, action):
+        return self.next_nodes.get(action)
+
+    def visit_counts(self):
+        return {action: node.n for action, node in self.next_nodes.items() if node.n > 0}
+
+    def legal_priors(self):
+        # (actions, priors) of the children eg for a TranspositionEntry
+        actions = np.fromiter(self.next_nodes.keys(), dtype=np.int64, count=len(self.next_nodes))
+        return actions, np.array([node.p for node in self.next_nodes.values()])
+
+    def make_root(self):
+        # new root of the tree after the real packing took its action, its subtree gets rebuilt
+        self.p = 1.0
+        self.prev_node = None
+        self.next_nodes = {}
+
     def expand(self, **kwargs):
         pass
 
@@ -130,24 +183,35 @@ class MCTSNode(Node):
         #     print("\t\t\tmasking", time.time()-start,  len(self.next_nodes))
 
         start = time.time()
-        for action in keep_actions:
-            action_possibility = credit * policy[action] #+ (1-credit) * (1/valid_action_num)
-            self.next_nodes[action] = MCTSNode(self, action_possibility)
+        self.expand_with(policy, value, current_box_mask, credit)
         if check_print:
             # print("\t\t\tmasking2x", time.time()-start, np.sum(current_box_mask), len(self.next_nodes))
             print("\t\t\tmasking2x", time.time()-start, len(self.next_nodes))
 
-
-        # no give-up action, default action is '0'
-        if len(self.next_nodes) == 0:
-            self.next_nodes[0] = MCTSNode(self, 1)
-
         # if len(sim_env.boxSeqGenerator.box_list) >= 1:
         #     start = time.time()
         #     value = self.roll_out(model, sim_env, check_print)
         #     if check_print:       
         #         print("\t\t\trollout took", time.time() - start)
 
+    def expand_with(self, policy, value, current_box_mask, credit=1):
+        '''
+        expand from an already evaluated model output eg from a batched prediction (see MCTree.tree_policy_batch)
+        '''
+        keep_actions = np.where(current_box_mask == 1)[0]
+        self.expand_from(keep_actions, credit * policy[keep_actions], value) #+ (1-credit) * (1/valid_action_num)
+
+    def expand_from(self, actions, priors, value):
+        '''
+        expand with children priors of legal actions eg from a TranspositionEntry
+        '''
+        for action, action_possibility in zip(actions, priors):
+            self.next_nodes[action] = MCTSNode(self, action_possibility)
+
+        # no give-up action, default action is '0'
+        if len(self.next_nodes) == 0:
+            self.next_nodes[0] = MCTSNode(self, 1)
+
         self.value = value
 
 
@@ -190,3 +254,157 @@ class MCTSNode(Node):
 
 
 
+
+
+class ArrayNode(object):
+    """
+    MCTS node with the priors & statistics of its children in NumPy arrays, for a node per legal action (up to the mask size)
+    the child objects get created only once a child is visited; a node's own n, w & p live in its parent's arrays
+    same interface as MCTSNode, see config.mcts_node_type
+    """
+    def __init__(self, prev, p, index=0):
+        self.prev_node = prev
+        self.index = index # in prev_node's arrays
+        self._n, self._w, self._p = 0, 0., p # own statistics while root
+
+        self.terminated = False
+        self.value = None
+        self.reward = 0
+        self.entry = None
+        self.virtual_loss = 0
+
+        self.actions = None # legal actions once expanded, sorted
+        self.priors = self.child_n = self.child_w = None
+        self.children = {} # index => ArrayNode of visited children
+
+    @property
+    def n(self):
+        return self._n if self.prev_node is None else self.prev_node.child_n[self.index]
+
+    @property
+    def w(self):
+        return self._w if self.prev_node is None else self.prev_node.child_w[self.index]
+
+    @property
+    def q(self):
+        n = self.n
+        return self.w / n if n > 0 else 0
+
+    @property
+    def p(self):
+        return self._p if self.prev_node is None else self.prev_node.priors[self.index]
+
+    @p.setter
+    def p(self, p):
+        if self.prev_node is None:
+            self._p = p
+        else:
+            self.prev_node.priors[self.index] = p
+
+    def _add(self, n, w):
+        if self.prev_node is None:
+            self._n += n
+            self._w += w
+        else:
+            self.prev_node.child_n[self.index] += n
+            self.prev_node.child_w[self.index] += w
+
+    def is_expanded(self):
+        return self.actions is not None
+
+    def is_terminated(self):
+        return self.terminated
+
+    def terminate(self):
+        self.terminated = True
+        self.p = 0
+
+    def update(self, value):
+        self._add(1, value)
+        if self.entry is not None:
+            self.entry.n += 1
+            self.entry.w += value
+
+    def add_virtual_loss(self, loss):
+        self._add(loss, -loss)
+        self.virtual_loss += loss
+
+    def revert_virtual_loss(self, loss):
+        self._add(-loss, loss)
+        self.virtual_loss -= loss
+
+    def get_q_value(self):
+        if self.entry is not None and self.entry.n > 0:
+            return (self.entry.w - self.virtual_loss) / (self.entry.n + self.virtual_loss)
+        return self.q
+
+    def get_u_value(self):
+        return self.p * np.sqrt(self.prev_node.n)/(self.n+1)
+
+    def child(self, index):
+        node = self.children.get(index)
+        if node is None:
+            node = self.children[index] = ArrayNode(self, None, index)
+        return node
+
+    def child_for_action(self, action):
+        index = np.searchsorted(self.actions, action)
+        if index < len(self.actions) and self.actions[index] == action:
+            return self.child(int(index))
+        return None
+
+    def visit_counts(self):
+        visited = np.flatnonzero(self.child_n > 0)
+        return dict(zip(self.actions[visited].tolist(), self.child_n[visited].tolist()))
+
+    def legal_priors(self):
+        return self.actions.copy(), self.priors.copy()
+
+    def make_root(self):
+        self._n, self._w, self._p = self.n, self.w, 1.0
+        self.prev_node = None
+        self.actions = None
+        self.priors = self.child_n = self.child_w = None
+        self.children = {}
+
+    def choose_best(self, c=1):
+        """
+        PUCT over all children at once, same scores as Node.choose_best
+        """
+        assert self.is_expanded()
+        visited = self.child_n > 0
+        q = np.divide(self.child_w, self.child_n, out=np.zeros(len(self.actions)), where=visited)
+        for index, node in self.children.items(): # statistics shared with transpositions
+            if node.entry is not None and visited[index]:
+                q[index] = node.get_q_value()
+
+        values = c * self.priors * np.sqrt(self.n) / (self.child_n + 1)
+        values += np.where(visited, q - self.get_q_value(), 0.)
+
+        best = np.flatnonzero(np.isclose(values, values.max(), rtol=1e-5, atol=0))
+        index = int(best[np.random.randint(0, len(best))])
+        return self.actions[index], self.child(index)
+
+    def expand(self, **kwargs):
+        sim_env = kwargs.get('sim_env')
+        model = kwargs.get("model")
+        credit = kwargs.get('credit')
+        credit = 1 if credit is None else credit
+        assert sim_env is not None
+
+        _, policy, _, value = model.predict(sim_env.current_obs, sim_env.current_box_mask)
+        self.expand_with(policy, value, sim_env.current_box_mask, credit)
+
+    def expand_with(self, policy, value, current_box_mask, credit=1):
+        keep_actions = np.where(current_box_mask == 1)[0]
+        self.expand_from(keep_actions, credit * policy[keep_actions], value)
+
+    def expand_from(self, actions, priors, value):
+        if len(actions) == 0: # no give-up action, default action is '0'
+            actions, priors = [0], [1]
+
+        self.actions = np.asarray(actions, dtype=np.int64)
+        self.priors = np.array(priors, dtype=np.float64)
+        self.child_n = np.zeros(len(self.actions))
+        self.child_w = np.zeros(len(self.actions))
+        self.value = float(value) # model output may come as a 0-d tensor
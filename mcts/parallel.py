@@ -0,0 +1,103 @@
+import math
+import numpy as np
+import sys
+from collections import Counter
+
+from torch.multiprocessing import get_context
+
+from .monteCarlo import MCTree
+
+sys.path.append("../")
+import config
+
+
+def _tree_worker(conn, model, seed):
+    # own tree on own copy of the env of the order being packed, kept in step with the real packing by "succeed"
+    np.random.seed(seed)
+    tree = environment = None
+    conn.send("ready")
+    while True:
+        cmd, arg = conn.recv()
+        if cmd == "reset":
+            environment, search_depth = arg
+            tree = MCTree(model, environment, search_depth)
+        elif cmd == "search":
+            sim_times, time_budget = arg
+            tree.select_action(sim_times, time_budget=time_budget)
+            actions, priors = tree.root.legal_priors()
+            conn.send((tree.root.visit_counts(), dict(zip(actions.tolist(), priors.tolist()))))
+        elif cmd == "succeed":
+            environment.step(arg, check_print=False, mode_mcts_sim=False)
+            tree.succeed(arg)
+        elif cmd == "best_packing":
+            conn.send(tree.best_packing)
+        else:
+            break
+    conn.close()
+
+
+class RootParallelMCTS(object):
+    """
+    root parallel MCTS: num_workers processes each grow an independent tree (own random tie breaks) for the current item,
+    the simulations of an item split between them, their root visit counts get summed & the most visited action is taken by all of them
+    workers are started once & load the model once, reset(environment) for each order, then same select_action/succeed/best_packing use as MCTree
+    close() when done
+    """
+    def __init__(self, model, num_workers):
+        ctx = get_context(config.mcts_worker_start_method)
+        self.visits = Counter() # summed root visit counts of the last item searched
+        self.conns = []
+        self.workers = []
+        for i in range(num_workers):
+            conn, child_conn = ctx.Pipe()
+            worker = ctx.Process(target=_tree_worker, args=(child_conn, model, np.random.randint(2**31)), daemon=True)
+            worker.start()
+            child_conn.close()
+            self.conns.append(conn)
+            self.workers.append(worker)
+
+        for conn in self.conns: # started up, so time budgets of the search don't pay for it
+            conn.recv()
+
+    def reset(self, environment, search_depth=None):
+        for conn in self.conns:
+            conn.send(("reset", (environment, search_depth)))
+
+    def select_action(self, sim_times, check_print=False, print_sim=False, time_budget=None):
+        # same simulations in total as a single tree, a time budget is spent by all of them at once
+        # at least 2 per tree, its first simulation only expands the root & the next ones visit its children
+        worker_sims = max(2, math.ceil(sim_times / len(self.conns)))
+        for conn in self.conns:
+            conn.send(("search", (worker_sims, time_budget)))
+
+        self.visits = Counter()
+        priors = Counter()
+        for conn in self.conns:
+            worker_visits, worker_priors = conn.recv()
+            self.visits.update(worker_visits)
+            priors.update(worker_priors)
+        # the trees may not have got past their roots eg on a tight time budget, then the model's priors decide
+        scores = self.visits if len(self.visits) > 0 else priors
+        # most visited, lowest action id on ties so every run is reproducible given the trees
+        return max(sorted(scores), key=scores.get)
+
+    def succeed(self, put_action):
+        for conn in self.conns:
+            conn.send(("succeed", int(put_action)))
+
+    @property
+    def best_packing(self):
+        for conn in self.conns:
+            conn.send(("best_packing", None))
+        packings = [p for p in (conn.recv() for conn in self.conns) if p is not None]
+        return min(packings, key=lambda p: p[0]) if len(packings) > 0 else None
+
+    def close(self):
+        for conn, worker in zip(self.conns, self.workers):
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
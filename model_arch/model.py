@@ -1,5 +1,7 @@
 import argparse
 import os
+import io
+import copy
 import shutil
 import time
 import random
@@ -24,8 +26,12 @@ import config
 
 class NNetWrapper():
     def __init__(self, net):
+        """
+        net: CNNPro, or None when only running a frozen graph from load_frozen()
+        """
         super(NNetWrapper, self).__init__()
         self.net = net
+        self.frozen = False # net is a frozen TorchScript graph, see save_frozen()
 
         self.FixedCategorical = torch.distributions.Categorical
         old_sample = self.FixedCategorical.sample
@@ -38,33 +44,54 @@ class NNetWrapper():
         self.FixedCategorical.mode = lambda self: self.probs.argmax(dim=-1, keepdim=True)
 
         # self.optimizer = KFACOptimizer(self.net)
-        self.optimizer = optim.RMSprop(self.net.parameters())
+        self.optimizer = optim.RMSprop(self.net.parameters()) if self.net is not None else None
 
         self.logsoftmax = torch.nn.LogSoftmax(dim=-1)
         self.value_loss_fn = torch.nn.MSELoss()
 
-    def predict(self, obs, mask, use_cuda=True):
-        if use_cuda:
-            device = torch.device("cuda:0")
+        # inference setup, done once by prepare_inference() instead of on every predict
+        self.device = None
+        self.num_threads = None
+        self.pinned_inputs = {} # reusable page-locked host buffers for copying inputs to GPU
+
+    def prepare_inference(self, device=None, num_threads=None):
+        """
+        device     : "cpu", "cuda:0", ... (default: cuda:0 if available else cpu)
+        num_threads: torch intra-op threads for the process running predictions eg 1 per worker process
+        """
+        if self.frozen:
+            device = "cpu" # frozen graph is exported for cpu only
+        elif device is None:
+            device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+        self.num_threads = num_threads
+        self.pinned_inputs = {}
+
+        if not self.frozen:
+            self.net.to(self.device)
+            self.net.eval()
+
+    def _to_device(self, name, arr):
+        arr = torch.from_numpy(np.ascontiguousarray(arr, dtype=np.float32)) # no copy for float32 input
+        if self.device.type == "cpu":
+            return arr
+
+        buffer = self.pinned_inputs.get(name)
+        if buffer is None or buffer.shape[0] < arr.shape[0] or buffer.shape[1:] != arr.shape[1:]:
+            buffer = torch.empty(arr.shape, dtype=torch.float32).pin_memory()
+            self.pinned_inputs[name] = buffer
+        buffer = buffer[:arr.shape[0]]
+        buffer.copy_(arr)
+        return buffer.to(self.device)
+
+    def predict(self, obs, mask, use_cuda=None):
+        if isinstance(obs, tuple):
+            obs = tuple(np.expand_dims(o, axis=0) for o in obs)
         else:
-            device = torch.device("cpu")
-
-        self.net.eval()
-        self.net.to(device)
-
-        obs = np.expand_dims(obs, axis=0)
+            obs = np.expand_dims(obs, axis=0)
         mask = mask.reshape(1, len(mask))
 
-        obs = torch.FloatTensor(obs).to(device)
-        mask = torch.FloatTensor(mask).to(device)
-        inverse_mask = (torch.ones_like(mask) - mask).to(device)
-
-        action_logits, critic_values = self.net(obs)
-        action_logits = action_logits - inverse_mask * 1e10
-
-        action_probs = F.softmax(action_logits, dim=-1)
-        action_probs = action_probs*mask
-        action_dist = self.FixedCategorical(probs=action_probs)
+        action_logits, action_probs, action_dist, critic_values = self.predict_batch(obs, mask, use_cuda)
 
         action_logits = action_logits[0]
         action_probs = action_probs[0]
@@ -72,6 +99,36 @@ class NNetWrapper():
 
         return action_logits, action_probs, action_dist, critic_values
 
+    def predict_batch(self, obs, mask, use_cuda=None):
+        """
+        one forward pass for a batch of observations eg MCTS leaves
+        obs: (batch, channel, max_X, max_Y) or compact ((batch, map_channel, max_X, max_Y), (batch, num_scalars)), see config.compact_obs
+        mask: (batch, act_len)
+        use_cuda: None keeps the device from prepare_inference()
+        """
+        if self.device is None or (use_cuda is not None and use_cuda != (self.device.type == "cuda")):
+            self.prepare_inference(None if use_cuda is None else ("cuda:0" if use_cuda else "cpu"), self.num_threads)
+        if self.num_threads is not None and torch.get_num_threads() != self.num_threads:
+            torch.set_num_threads(self.num_threads) # per process, so also applies in freshly spawned workers
+
+        with torch.inference_mode():
+            mask = self._to_device("mask", mask)
+            inverse_mask = torch.ones_like(mask) - mask
+
+            if isinstance(obs, tuple):
+                net_inputs = (self._to_device("obs", obs[0]), self._to_device("scalars", obs[1]), mask)
+            else:
+                net_inputs = (self._to_device("obs", obs),)
+
+            action_logits, critic_values = self.net(*net_inputs)
+            action_logits = action_logits - inverse_mask * 1e10
+
+            action_probs = F.softmax(action_logits, dim=-1)
+            action_probs = action_probs*mask
+            action_dist = self.FixedCategorical(probs=action_probs)
+
+        return action_logits, action_probs, action_dist, critic_values
+
     def train(self, trainExamples, use_cuda=True):
         acktr = False
 
@@ -81,6 +138,7 @@ class NNetWrapper():
             device = torch.device("cpu")
 
         self.net.to(device)
+        self.device = None # back to prepare_inference() on next predict
 
         for epoch in range(config.epochs):
             print('EPOCH ::: ' + str(epoch+1))
@@ -94,15 +152,19 @@ class NNetWrapper():
 
                 # episode
                 sample_obs, sample_masks, sample_actions, sample_action_policy, sample_critic_values = list(zip(*[trainExamples[i] for i in sample_ids]))
-                sample_obs = torch.FloatTensor(np.array(sample_obs)).to(device)
                 sample_masks = torch.FloatTensor(np.array(sample_masks)).to(device)
+                if isinstance(sample_obs[0], tuple): # compact observations
+                    sample_maps, sample_scalars = [torch.FloatTensor(np.array(o)).to(device) for o in zip(*sample_obs)]
+                    net_inputs = (sample_maps, sample_scalars, sample_masks)
+                else:
+                    net_inputs = (torch.FloatTensor(np.array(sample_obs)).to(device),)
                 inverse_masks = (torch.ones_like(sample_masks) - sample_masks).to(device)
                 sample_actions = torch.FloatTensor(np.array(sample_actions)).to(device)
                 sample_action_policy = torch.FloatTensor(np.array(sample_action_policy)).to(device)               
                 sample_critic_values = torch.FloatTensor(np.array(sample_critic_values)).to(device)
 
                 # network output
-                action_logits, critic_values = self.net(sample_obs)
+                action_logits, critic_values = self.net(*net_inputs)
                 action_logits = action_logits - inverse_masks * 1e10
                 action_logsoftmax = self.logsoftmax(action_logits)
 
@@ -160,7 +222,58 @@ class NNetWrapper():
     def load_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         filepath = os.path.join(folder, filename)
         if not os.path.exists(filepath):
-            raise("No model in path {}".format(filepath))
+            raise FileNotFoundError("No model in path {}".format(filepath))
         checkpoint = torch.load(filepath, map_location=torch.device("cpu"))
         self.net.load_state_dict(checkpoint['state_dict'])
 
+    def save_frozen(self, folder='checkpoint', filename='model_frozen.pt', quantize=False):
+        """
+        export net for cpu inference only as a traced & frozen TorchScript graph (weights folded in as constants),
+        loadable with load_frozen() without net.py/the training code
+        quantize: dynamic int8 quantization of the actor's Linear layers eg Linear(actor_hidden, act_len) which holds most weights
+        """
+        filepath = os.path.join(folder, filename)
+        if not os.path.exists(folder):
+            print("Checkpoint Directory does not exist! Making directory {}".format(folder))
+            os.mkdir(folder)
+
+        net = copy.deepcopy(self.net).to(torch.device("cpu")).eval()
+        if quantize:
+            net.actor = torch.quantization.quantize_dynamic(net.actor, {nn.Linear}, dtype=torch.qint8)
+
+        if config.compact_obs: # graph takes the observation format of the config it was exported with
+            example_inputs = (torch.zeros(1, config.map_channel, config.max_X, config.max_Y), torch.zeros(1, config.num_scalars), torch.zeros(1, config.act_len))
+        else:
+            example_inputs = (torch.zeros(1, config.channel, config.max_X, config.max_Y),)
+        with torch.no_grad():
+            frozen_net = torch.jit.freeze(torch.jit.trace(net, example_inputs))
+        torch.jit.save(frozen_net, filepath)
+        return filepath
+
+    def load_frozen(self, folder='checkpoint', filename='model_frozen.pt', num_threads=None):
+        filepath = os.path.join(folder, filename)
+        if not os.path.exists(filepath):
+            raise FileNotFoundError("No model in path {}".format(filepath))
+        with open(filepath, "rb") as f:
+            self.frozen_graph = f.read()
+        self.net = self._load_frozen_graph(self.frozen_graph)
+        self.frozen = True
+        self.optimizer = None
+        self.prepare_inference(device="cpu", num_threads=num_threads)
+
+    @staticmethod
+    def _load_frozen_graph(frozen_graph):
+        # conv+relu fusion & prepacked weights for the local cpu, done in place after every load as the result can't be saved
+        return torch.jit.optimize_for_inference(torch.jit.load(io.BytesIO(frozen_graph), map_location=torch.device("cpu")))
+
+    def __getstate__(self):
+        # TorchScript graphs can't be pickled (eg for worker processes), ship the serialized graph instead
+        state = self.__dict__.copy()
+        if self.frozen:
+            state["net"] = None
+        return state
+
+    def __setstate__(self, state):
+        if state.get("frozen"):
+            state["net"] = self._load_frozen_graph(state["frozen_graph"])
+        self.__dict__.update(state)
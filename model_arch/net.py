@@ -63,9 +63,26 @@ class CNNPro(nn.Module):
             nn.Linear(config.critic_hidden, 1)
         )
 
+        # channel order of the full observation out of [height maps, scalar planes, mask planes] for compact observations
+        n = config.num_containers
+        full_channels = []
+        for container_id in range(n):
+            full_channels += [container_id, n + 2*container_id, n + 2*container_id + 1]
+        full_channels += list(range(n + 2*n, n + config.num_scalars)) # current box, remaining boxes
+        full_channels += list(range(n + config.num_scalars, config.channel)) # mask
+        self.register_buffer("full_channels", torch.tensor(full_channels), persistent=False) # not in state_dict, old checkpoints load as is
+
         self.train()
 
-    def forward(self, inputs):
+    def forward(self, inputs, scalars=None, mask=None):
+        """
+        inputs: full observation (batch, channel, max_X, max_Y)
+                or with scalars & mask, compact one (batch, map_channel, max_X, max_Y) see config.compact_obs
+        """
+        if scalars is not None:
+            scalar_planes = scalars[:, :, None, None].expand(-1, -1, config.max_X, config.max_Y)
+            mask_planes = mask.view(mask.size(0), -1, config.max_X, config.max_Y)
+            inputs = torch.cat([inputs, scalar_planes, mask_planes], dim=1)[:, self.full_channels]
 
         share = self.share(inputs)
 
@@ -0,0 +1,114 @@
+'''
+Streaming input of customer orders for predict.py
+	- order files as Excel, CSV, Parquet or JSON lines with columns ORDER_ID, ITEM_ID, ORDER_QTY, ...
+	- read in chunks of rows, joined with the item master's dimensions & grouped by ORDER_ID once
+	- orders come out of a generator as soon as their last row is read, so only orders still being read are kept in memory
+'''
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+
+
+def read_table(path, **kwargs):
+	'''
+	whole table from an Excel, CSV, Parquet or JSON lines file eg the item master
+	'''
+	ext = os.path.splitext(path)[1].lower()
+	if ext in (".xlsx", ".xls"):
+		return pd.read_excel(path, header=0, **kwargs)
+	if ext == ".csv":
+		return pd.read_csv(path, **kwargs)
+	if ext == ".parquet":
+		return pd.read_parquet(path, **kwargs)
+	if ext in (".jsonl", ".json"):
+		return pd.read_json(path, lines=True, **kwargs)
+	raise ValueError("unsupported file type {}".format(path))
+
+
+def chunked(path):
+	# Excel can't be read in parts
+	return os.path.splitext(path)[1].lower() in (".csv", ".jsonl", ".json", ".parquet")
+
+
+def iter_chunks(path, chunk_rows=config.ORDER_READ_CHUNK_ROWS, columns=None):
+	'''
+	rows of an order file as DataFrames of up to chunk_rows rows (Excel comes as one chunk), only columns if given
+	'''
+	ext = os.path.splitext(path)[1].lower()
+	if ext == ".csv":
+		yield from pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+	elif ext in (".jsonl", ".json"):
+		for chunk in pd.read_json(path, lines=True, chunksize=chunk_rows):
+			yield chunk if columns is None else chunk[columns]
+	elif ext == ".parquet":
+		import pyarrow.parquet as pq # only needed for parquet input
+		pf = pq.ParquetFile(path)
+		for i in range(pf.num_row_groups): # a row group at a time, ParquetFile.iter_batches is pyarrow 3.0+
+			group = pf.read_row_group(i, columns=columns)
+			for offset in range(0, group.num_rows, chunk_rows):
+				yield group.slice(offset, chunk_rows).to_pandas()
+	else:
+		chunk = read_table(path)
+		yield chunk if columns is None else chunk[columns]
+
+
+def order_last_rows(path, chunk_rows=config.ORDER_READ_CHUNK_ROWS):
+	'''
+	{order_id: row number of the order's last row in the file} from a pass over the ORDER_ID column only
+	'''
+	last_rows = {}
+	num_rows = 0
+	for chunk in iter_chunks(path, chunk_rows, columns=["ORDER_ID"]):
+		rows = pd.Series(np.arange(num_rows, num_rows + len(chunk)), index=chunk["ORDER_ID"].astype(str).to_numpy())
+		last_rows.update(rows.groupby(level=0).max().to_dict())
+		num_rows += len(chunk)
+	return last_rows
+
+
+def iter_orders(path, item_master_df, sorted_input=False, chunk_rows=config.ORDER_READ_CHUNK_ROWS):
+	'''
+	(order_id, rows of the order joined with item_master_df) for each ORDER_ID, in order of first appearance but see sorted_input
+	rows keep their row number in the file as index
+	sorted_input: rows of an order are next to each other in the file, so each order can be given out as soon as the next one starts
+	              else orders are given out once their last row is read (see order_last_rows), the order of first appearance
+	              among the orders completed by a chunk
+	item_master_df: first row of an ITEM_ID is used if it has more
+	'''
+	item_master_df = item_master_df.drop_duplicates("ITEM_ID") # a row per order row after the merge
+	last_rows = order_last_rows(path, chunk_rows) if not sorted_input and chunked(path) else None
+
+	pending = {} # order_id => [row chunks]
+	num_rows = 0
+	for chunk in iter_chunks(path, chunk_rows):
+		chunk.index = pd.RangeIndex(num_rows, num_rows + len(chunk))
+		num_rows += len(chunk)
+
+		chunk["ORDER_ID"] = chunk["ORDER_ID"].astype(str)
+		chunk = chunk.merge(item_master_df, on=["ITEM_ID"], how="left").set_index(chunk.index)
+
+		for order_id, rows in chunk.groupby("ORDER_ID", sort=False):
+			pending.setdefault(order_id, []).append(rows)
+
+		if sorted_input:
+			# all but the last order of the chunk are complete
+			for order_id in list(pending.keys())[:-1]:
+				yield order_id, pd.concat(pending.pop(order_id))
+		elif last_rows is not None:
+			for order_id in [order_id for order_id in pending if last_rows.get(order_id, np.inf) < num_rows]:
+				yield order_id, pd.concat(pending.pop(order_id))
+
+	for order_id, parts in pending.items():
+		yield order_id, pd.concat(parts)
+
+
+ITEM_COLS = ["UNIT_LENGTH (Inches)", "UNIT_WIDTH (Inches)", "UNIT_HEIGHT (Inches)", "UNIT_WEIGHT (LBs)"]
+
+def order_arrays(order_df):
+	'''
+	compact copy of an order's rows for the packing processes
+	(item ids, order quantities, [[length, width, height, weight], ...] per row)
+	'''
+	return order_df["ITEM_ID"].to_numpy(), order_df["ORDER_QTY"].to_numpy(), order_df[ITEM_COLS].to_numpy(dtype=np.float64)
@@ -15,8 +15,39 @@ LWH/XYZ convention [(0,0,0)=> Front-Left-Bottom corner]:
 """
 import numpy as np
 import copy
+import functools
+
+
+def distinct_rotations(oriented):
+    """
+    oriented: (dx, dy, dz) after each rotation 0..3
+    return ((rotation, (dx, dy, dz)), ...) for distinct orientations only, the first rotation kept for equal ones (1 for a cube)
+    """
+    table = []
+    for rotation, dims in enumerate(oriented):
+        if all(dims != d for _, d in table):
+            table.append((rotation, dims))
+    return tuple(table)
+
+
+@functools.lru_cache(maxsize=4096)
+def rotation_table(dx, dy, dz):
+    # once per distinct box size, see Box.rotation_table
+    return distinct_rotations(((dx, dy, dz), (dy, dx, dz), (dz, dy, dx), (dx, dz, dy)))
+
 
 class Box(object):
+    # one record per item, fixed attributes & no per-instance dict, see BoxArray for a whole order's columns
+    __slots__ = ("x", "y", "z", "dx", "dy", "dz", "wt", "parent_gen", "name", "orig_size", "orig_intXY_sort_size",
+                 "pack_rot", "pack_cntr_id", "pack_cntr_name", "pack_cntr_size")
+
+    rotate_NOOP = 0 # no rotation
+    rotate_XY = 1 # X<->Y, 
+    rotate_XZ = 2 # X<->Z, 
+    rotate_YZ = 3 # Y<->Z
+
+    rotation_lookUp = {0:"None", 1:"X<->Y", 2:"X<->Z", 3:"Y<->Z"}
+
     def __init__(self, x=None, y=None, z=None, dx=None, dy=None, dz=None, wt=None, name=None, parent_gen=None, orig_size=None, orig_intXY_sort_size=None, pack_cntr_id=None, pack_cntr_name=None, pack_cntr_size=None, pack_rot=0):        
         """
         dx,dy,dz : size of the item/box in inches
@@ -39,12 +70,14 @@ class Box(object):
         self.pack_cntr_name = pack_cntr_name     
         self.pack_cntr_size = pack_cntr_size  
 
-        self.rotate_NOOP = 0 # no rotation
-        self.rotate_XY = 1 # X<->Y, 
-        self.rotate_XZ = 2 # X<->Z, 
-        self.rotate_YZ = 3 # Y<->Z
-
-        self.rotation_lookUp = {0:"None", 1:"X<->Y", 2:"X<->Z", 3:"Y<->Z"}
+    def __deepcopy__(self, memo):
+        # all attributes are numbers, strings or tuples except orig_size (a list), far cheaper than the generic deepcopy
+        b = Box.__new__(Box)
+        for attr in Box.__slots__:
+            setattr(b, attr, getattr(self, attr))
+        b.orig_size = copy.copy(self.orig_size)
+        memo[id(self)] = b
+        return b
 
     def vol(self):
         return self.dx*self.dy*self.dz
@@ -52,13 +85,33 @@ class Box(object):
     def standardize(self):
         return tuple([self.x, self.y, self.z, self.dx, self.dy, self.dz, self.wt])
     
+    def pack_state(self):
+        """
+        everything changed while packing the box: rotated size, position & container (see PackEnv.snapshot)
+        """
+        return (self.x, self.y, self.z, self.dx, self.dy, self.dz, self.pack_rot, self.pack_cntr_id, self.pack_cntr_name, self.pack_cntr_size)
+
+    def set_pack_state(self, state):
+        self.x, self.y, self.z, self.dx, self.dy, self.dz, self.pack_rot, self.pack_cntr_id, self.pack_cntr_name, self.pack_cntr_size = state
+
+    def rotation_table(self):
+        """
+        ((rotation, (dx, dy, dz) after it), ...) for the distinct orientations of this box as it is now
+        """
+        return rotation_table(self.dx, self.dy, self.dz)
+
+    def oriented_dims(self, rotation):
+        """
+        (dx, dy, dz) of this box after rotation, duplicates of the table included
+        """
+        dx, dy, dz = self.dx, self.dy, self.dz
+        return ((dx, dy, dz), (dy, dx, dz), (dz, dy, dx), (dx, dz, dy))[rotation]
+
     def rotate(self, rotation):
         """
         Rotate this Box in place
         """
-        if (rotation == self.rotate_XY): self.dx, self.dy = self.dy, self.dx
-        if (rotation == self.rotate_XZ): self.dx, self.dz = self.dz, self.dx
-        if (rotation == self.rotate_YZ): self.dy, self.dz = self.dz, self.dy
+        self.dx, self.dy, self.dz = self.oriented_dims(rotation)
     
     def __repr__(self):
         """
@@ -70,4 +123,61 @@ class Box(object):
 
     def basic_info(self):
         desc = self.name + " Pos:{}".format((np.round(self.x,3), np.round(self.y,3), np.round(self.z,3))) + " Pack_XYZ:{}".format((self.dx, self.dy, self.dz))
-        return desc
\ No newline at end of file
+        return desc
+
+
+class BoxArray(object):
+    """
+    a whole order's boxes as NumPy columns (struct of arrays), built once per order for its aggregates in one call each
+    eg totals of PackEnv, the packing cache key & PackEnv.remaining_counts
+    columns: dims (n, 3) as dx, dy, dz; wt (n,)
+    rows in no particular order; sizes & weights only, positions, rotations & containers stay on the Box records
+    the packing moves & rotates one at a time, Box isn't a view onto these columns
+    """
+    def __init__(self, dims, wt):
+        self.dims = np.asarray(dims, dtype=np.float64).reshape(-1, 3)
+        self.wt = np.asarray(wt, dtype=np.float64)
+
+    @classmethod
+    def from_order(cls, order_qtys, item_dims):
+        """
+        order_qtys, item_dims: per row of the order as in predict.pack_order_items, sizes get sorted largest side first like its items
+        """
+        qtys = np.asarray(order_qtys, dtype=np.int64)
+        item_dims = np.asarray(item_dims, dtype=np.float64).reshape(-1, 4)
+        return cls(np.repeat(-np.sort(-item_dims[:, :3], axis=1), qtys, axis=0), np.repeat(item_dims[:, 3], qtys))
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        return cls([(b.dx, b.dy, b.dz) for b in boxes], [b.wt for b in boxes])
+
+    def integerized(self):
+        # sizes rounded up as for the RL model's boxes
+        return BoxArray(np.ceil(self.dims), self.wt)
+
+    def __len__(self):
+        return len(self.wt)
+
+    def vols(self):
+        return self.dims.prod(axis=1)
+
+    def total_weight(self):
+        return float(self.wt.sum())
+
+    def total_volume(self):
+        return float(self.vols().sum())
+
+    def distinct_boxes(self):
+        """
+        (distinct boxes as sorted rows [dx, dy, dz, wt] with sizes largest side first, index of each row's box among them)
+        so sizes in any orientation count as the same box
+        """
+        rows, ids = np.unique(np.column_stack([-np.sort(-self.dims, axis=1), self.wt]), axis=0, return_inverse=True)
+        return rows, ids.reshape(-1)
+
+    def multiset(self):
+        """
+        [((dx, dy, dz, wt), count), ...] of the distinct boxes, sorted
+        """
+        rows, counts = np.unique(np.column_stack([self.dims, self.wt]), axis=0, return_counts=True)
+        return [(tuple(row), count) for row, count in zip(rows.tolist(), counts.tolist())]
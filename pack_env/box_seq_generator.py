@@ -15,22 +15,24 @@ import copy
 import random
 import sys
 
-from .box import Box
+from .box import Box, BoxArray
 from .container import Container
 
 sys.path.append("../")
 import config
 
 class PredictionBoxSeqCreator():
-    def __init__(self, customer_order_list=None, seed=None):
+    def __init__(self, customer_order_list=None, seed=None, order_boxes=None):
         '''
         creates input sequence for model prediction
         customer_order_list => list of items/boxes to be packed in the containers for the resp. customer order
+        order_boxes => the same boxes as a BoxArray if already built, else built from customer_order_list
         '''
         # super(PredictionBoxSeqCreator).__init__()
 
         self.num_items = config.num_items
         self.customer_order_list = copy.deepcopy(customer_order_list)
+        self.order_boxes = order_boxes
         self.customer_id = customer_order_list[0].parent_gen
         
         self.allow_rotations  = config.allow_rotations
@@ -82,7 +84,8 @@ class PredictionBoxSeqCreator():
     def generate_box_list(self):
         self.box_list = self.customer_order_list
         self.num_boxes = len(self.box_list)
-        self.full_box_vol = sum([b.vol() for b in self.box_list])
+        self.boxes = BoxArray.from_boxes(self.box_list) if self.order_boxes is None else self.order_boxes
+        self.full_box_vol = self.boxes.total_volume()
 
 
 class CuttingBoxSeqCreator():
@@ -205,7 +208,8 @@ class CuttingBoxSeqCreator():
         # self.box_list = self.box_list[:1]
         self.num_boxes = len(self.box_list)    
         # self.box_list[-3] = Box(x=15, y=0, z=0, dx=18, dy=7, dz=4, wt=1.09)
-        self.full_box_vol = sum([b.vol() for b in self.box_list])
+        self.boxes = BoxArray.from_boxes(self.box_list)
+        self.full_box_vol = self.boxes.total_volume()
 
     def _check_box_size_valid(self, box):
         return  ( (self.minSideLen <= box.dx <= self.maxSideLen) and
@@ -0,0 +1,60 @@
+"""
+Container catalogue index (check CONTAINERS_CONFIG in root directory's containers_info.py), built once at import
+
+    - containers smallest to biggest by volume (catalogue order on ties) with their sizes & limits
+    - containers that can hold an aggregate of items: binary search on volume, then a scan of the bigger ones' limits
+      (a few dozen containers at most, where a NumPy call costs more than the comparisons it would vectorize)
+    - containers that can hold a box in some orientation: one vectorized comparison of sorted sizes
+"""
+import sys, bisect
+
+import numpy as np
+
+sys.path.append("../")
+import config
+
+
+class ContainerCatalogue(object):
+    def __init__(self, container_details):
+        """
+        container_details: {container_id: {"L", "W", "H", "X", "Y", "Z", "max_weight", "max_vol", ...}} as in CONTAINERS_CONFIG
+        """
+        ids = list(container_details.keys())
+        order = np.argsort([container_details[cid]["max_vol"] for cid in ids], kind="stable")
+        details = [container_details[ids[i]] for i in order]
+
+        self.ids = [ids[i] for i in order] # smallest to biggest
+        self.rank = {cid: i for i, cid in enumerate(self.ids)}
+
+        # (container_id, L, W, H, max_weight) & max_vol smallest to biggest
+        self.vols = [d["max_vol"] for d in details]
+        self.limits = [(cid, d["L"], d["W"], d["H"], d["max_weight"]) for cid, d in zip(self.ids, details)]
+
+        # integer XYZ sizes, largest side first, by container id
+        self.sorted_xyz = np.zeros((max(ids) + 1, 3))
+        for cid in ids:
+            self.sorted_xyz[cid] = sorted([container_details[cid][dim] for dim in ["X", "Y", "Z"]], reverse=True)
+
+    def holding(self, max_X, max_Y, max_Z, weight, vol):
+        """
+        ids of the containers, smallest first, within whose L, W, H, max weight & volume an aggregate of items fits
+        max_X, max_Y, max_Z: largest item size along each axis as placed (see PackHeuristic)
+        """
+        start = bisect.bisect_left(self.vols, vol) # first container with max_vol >= vol
+        return [cid for cid, L, W, H, max_weight in self.limits[start:] if weight <= max_weight and max_X <= L and max_Y <= W and max_Z <= H]
+
+    def holding_dims(self, dims):
+        """
+        boolean array by container id: container holds a box of size dims in some orientation
+        dims: box size, largest side first
+        """
+        return np.all(self.sorted_xyz >= dims, axis=1)
+
+    def by_volume(self, container_ids):
+        """
+        container_ids smallest to biggest
+        """
+        return sorted(container_ids, key=self.rank.__getitem__)
+
+
+CATALOGUE = ContainerCatalogue(config.CONTAINERS_CONFIG["container_details"])
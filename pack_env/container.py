@@ -21,6 +21,7 @@ import numpy as np
 import copy, os, sys
 
 from .box import Box
+from .height_index import HeightMapIndex
 
 sys.path.append("../")
 import config
@@ -59,6 +60,7 @@ class Container(object):
 
         # keep track of z-axis accessibility for each of XY grid points eg minimum height at which a new item can be placed for a given (x,y) grid point
         self.height_map = None
+        self.height_index = None # O(1) max height/supported area lookups under any footprint, see height_index.py
         self._init_height_map() # need to make consistent for all containers (eg from container_sets.py with different length & width)
         
     def __repr__(self):
@@ -74,6 +76,7 @@ class Container(object):
         self.height_map = np.ones((self.max_X, self.max_Y))*(self.max_Z - self.dz) # keep only dz from top empty. makes consistent for all containers
         self.height_map[:, self.dy:] = self.max_Z # invalid y coordinates; unaccessible by marking fully occupied on z-axis
         self.height_map[self.dx:, :] = self.max_Z # invalid x coordinates; unaccessible by marking fully occupied on z-axis
+        self.height_index = HeightMapIndex(self.height_map, self.dx, self.dy) # only the accessible region is ever queried
 
 
     def reset(self):
@@ -85,12 +88,35 @@ class Container(object):
         self.height_map = None
         self._init_height_map()
 
+    def get_state(self):
+        """
+        copy of everything drop_box & reset change, see ContainerSets.snapshot
+        """
+        return (list(self.boxes), self.total_box_wts, self.total_box_vols, self.free_wt, self.free_vol,
+                    self.height_map.copy(), self.height_index.get_tables())
+
+    def set_state(self, state):
+        """
+        restore a state from get_state(), taking ownership of its arrays
+        """
+        self.boxes, self.total_box_wts, self.total_box_vols, self.free_wt, self.free_vol, self.height_map, tables = state
+        self.height_index = HeightMapIndex(self.height_map, self.dx, self.dy)
+        self.height_index.set_tables(tables)
+
     def get_hwv_map(self):
         height_map   = copy.deepcopy(self.height_map)
         free_wt_map  = np.ones((self.max_X, self.max_Y))*self.free_wt
         free_vol_map = np.ones((self.max_X, self.max_Y))*self.free_vol
         return np.stack((height_map, free_wt_map, free_vol_map), axis=0)
 
+    def write_hwv_map(self, out):
+        """
+        same as get_hwv_map() but written into out (3, max_X, max_Y) eg a slice of the env's observation buffer
+        """
+        out[0] = self.height_map
+        out[1] = self.free_wt
+        out[2] = self.free_vol
+
     @staticmethod
     def update_height_map(hmap, box):
         le = box.x
@@ -116,11 +142,11 @@ class Container(object):
         if x+box.dx > self.dx or y+box.dy > self.dy: return -1
         if x < 0 or y < 0: return -1
 
-        rec = self.height_map[x:x+box.dx, y:y+box.dy]
-        r00 = rec[ 0, 0]
-        r10 = rec[-1, 0]
-        r01 = rec[ 0,-1]
-        r11 = rec[-1,-1]
+        x1, y1 = x+box.dx-1, y+box.dy-1
+        r00 = self.height_map[x , y ]
+        r10 = self.height_map[x1, y ]
+        r01 = self.height_map[x , y1]
+        r11 = self.height_map[x1, y1]
         rm = max(r00,r10,r01,r11)
         supportedCorners = int(r00==rm)+int(r10==rm)+int(r01==rm)+int(r11==rm)
         if supportedCorners < config.min_supported_corners:
@@ -128,7 +154,7 @@ class Container(object):
                 print("less than 3 supported corners", box, "=>", (self.container_name, x, y, self.dz, self.max_Z))
             return -1
 
-        max_h = np.max(rec) # box base height if placed here
+        max_h = self.height_index.max_height(x, y, box.dx, box.dy) # box base height if placed here
         assert max_h >= 0
         if max_h + box.dz > self.max_Z:
             if check_print:
@@ -136,7 +162,7 @@ class Container(object):
             return -1
 
         # check box base is well supported
-        max_area = np.sum(rec==max_h)
+        max_area = self.height_index.area_at(max_h, x, y, box.dx, box.dy)
         area = box.dx * box.dy
 
         if checkMode == "strict" and max_area<area: return -1
@@ -153,6 +179,46 @@ class Container(object):
         return -1
 
 
+    def check_box_placement_valid_grid(self, dx, dy, dz, checkMode="normal"):
+        """
+        vectorized check_box_placement_valid over every (x,y) anchor position at once
+        return array of shape (max_X, max_Y) with -1 where placement is invalid & box base height where placement is good
+
+        dx,dy,dz: size of the box as placed (see Box.rotation_table)
+        checkMode: str "normal" or "strict" [at "strict" check the box must be supported 100% below its base]
+        """
+        base_h = -np.ones((self.max_X, self.max_Y))
+
+        nx = self.dx - dx + 1 # number of valid anchor positions along x & y
+        ny = self.dy - dy + 1
+        if nx <= 0 or ny <= 0 or dx <= 0 or dy <= 0: return base_h
+
+        hmap = self.height_map[:self.dx, :self.dy]
+        r00 = hmap[   :nx,        :ny]
+        r10 = hmap[dx-1:dx-1+nx,   :ny]
+        r01 = hmap[   :nx,    dy-1:dy-1+ny]
+        r11 = hmap[dx-1:dx-1+nx, dy-1:dy-1+ny]
+        rm = np.maximum(np.maximum(r00, r10), np.maximum(r01, r11))
+        supportedCorners = (r00==rm).astype(np.int8) + (r10==rm) + (r01==rm) + (r11==rm)
+
+        max_h = self.height_index.max_height_grid(dx, dy) # box base height for every anchor
+        max_area = self.height_index.area_at_grid(max_h, dx, dy)
+        area = dx * dy
+        area_frac = max_area/area
+
+        valid = (supportedCorners >= config.min_supported_corners) & (max_h + dz <= self.max_Z)
+        if checkMode == "strict":
+            valid &= (max_area >= area)
+
+        supported = (area_frac > 0.95/3) \
+                        | ((rm == max_h) & (supportedCorners == 3) & (area_frac > 0.85/3)) \
+                        | ((rm == max_h) & (supportedCorners == 4) & (area_frac > 0.50/3))
+        valid &= supported
+
+        base_h[:nx, :ny] = np.where(valid, max_h, -1)
+        return base_h
+
+
     def drop_box(self, box, pos, check_print=False):
         """
         place a box at pos into the container
@@ -173,7 +239,7 @@ class Container(object):
         box.x, box.y, box.z = x, y, new_h
         self.boxes.append(box)
 
-        self.height_map = self.update_height_map(self.height_map, box)
+        self.height_index.fill(box.x, box.y, box.dx, box.dy, box.z + box.dz) # same as update_height_map, patching the index in place
 
         self.total_box_wts = sum([b.wt for b in self.boxes])
         self.total_box_vols = sum([b.vol() for b in self.boxes])
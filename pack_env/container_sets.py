@@ -6,10 +6,10 @@ Configuration for all containers simultaneously; (check CONTAINERS_CONFIG in roo
 import numpy as np
 from functools import reduce
 import copy, time, sys
-from joblib import Parallel, delayed, parallel_backend
 
 from .box import Box
 from .container import Container
+from .catalogue import CATALOGUE
 
 sys.path.append("../")
 import config
@@ -60,6 +60,9 @@ class ContainerSets():
 		self.packed_boxes   = []		
 		self.current_box_id = 0
 
+		self.cow_state = None # latest snapshot, containers get saved into it right before their first change
+		self.changed_container_ids = set(range(self.num_containers)) # containers whose hwv map changed since the last write_hwv_maps()
+
 
 	def reset(self):
 		self.containers = []
@@ -81,6 +84,9 @@ class ContainerSets():
 		self.packed_boxes   = []		
 		self.current_box_id = 0
 
+		self.cow_state = None # latest snapshot, containers get saved into it right before their first change
+		self.changed_container_ids = set(range(self.num_containers))
+
 	def _init_containers(self):
 		combined_hwv_map  = []
 		for container_id in range(self.num_containers):
@@ -104,6 +110,7 @@ class ContainerSets():
 		mask   = np.zeros((self.num_containers, self.num_rotations, self.max_X, self.max_Y), dtype=np.int8)
 		box_dims = [box.dx, box.dy, box.dz]
 		box_dims.sort(reverse=True)
+		box_rotations = [(rotation, dims) for rotation, dims in box.rotation_table() if rotation in rotations]
 
 		# if box_id == 0:
 		# 	sum_cntr_mask = 1
@@ -112,51 +119,89 @@ class ContainerSets():
 		# else:
 		# 	sum_cntr_mask = 50
 		sum_cntr_mask = 1000
+		num_valid = 0 # mask capped at 1000 valid placements in total
+		num_cntr_valid = {container_id:0 for container_id in use_container_ids}
+		dims_fit = CATALOGUE.holding_dims(box_dims)
 
 		for container_id in use_container_ids:
-			container      = self.containers[container_id]
-			container_dims = [container.dx, container.dy, container.dz]
-			container_dims.sort(reverse=True)
+			container = self.containers[container_id]
 
 			# check any dim violation
-			dim_condn = (sum([container_dims[k] < box_dims[k] for k in range(3)]) > 0)
+			dim_condn = not dims_fit[container_id]
 			wt_condn  = container.free_wt < box.wt
 			vol_condn = container.free_vol < box.vol()
 
 			if dim_condn or wt_condn or vol_condn:continue
 
-			for rotation in rotations:
-				start = time.time()
-				b = copy.deepcopy(box)
-				# print("dc", time.time() - start)
-				if rotation > 0:b.rotate(rotation)
-
-				if (b.dx > container.dx) or (b.dy > container.dy) or (b.dz > container.dz):continue
+			# distinct orientations only, a rotation giving the same (dx, dy, dz) as an earlier one stays masked out
+			for rotation, (dx, dy, dz) in box_rotations:
+				if (dx > container.dx) or (dy > container.dy) or (dz > container.dz):continue
 
-				for y in range(container.dy - b.dy + 1):
-					# if rotation == 2 and y <= int(container.dy*.8): break
-					if y in self.containers_invalid_XY[container_id]["y"]:break
+				budget = min(1000 - num_valid, sum_cntr_mask - num_cntr_valid[container_id])
+				if budget <= 0:continue
 
-					for x in range(container.dx - b.dx + 1):
-						# if rotation == 3 and x <= int(container.dx*.8): break
-						if x in self.containers_invalid_XY[container_id]["x"]:break
+				# whole (x,y) grid for this container & rotation at once
+				valid = container.check_box_placement_valid_grid(dx, dy, dz) >= 0
 
-						if (np.sum(mask) >= 1000) or (np.sum(mask[container_id, ...]) >= sum_cntr_mask):break
+				# keep only the first valid positions within budget, scanning y-major & x-minor
+				valid_yx = valid.T
+				valid_yx &= np.cumsum(valid_yx).reshape(valid_yx.shape) <= budget
 
-						valid_placement = container.check_box_placement_valid(b, (x, y))
-
-						if valid_placement >= 0:
-							mask[container_id, rotation, x, y] = 1
-					
-					if (np.sum(mask) >= 1000) or (np.sum(mask[container_id, ...]) >= sum_cntr_mask):break
-				
-			# 	if (np.sum(mask) >= 100) or (np.sum(mask[container_id, ...]) >= sum_cntr_mask):break
-			# if (np.sum(mask) >= 100) or (np.sum(mask[container_id, ...]) >= sum_cntr_mask):break
+				mask[container_id, rotation] = valid
+				num_valid_rot = int(np.sum(valid))
+				num_valid += num_valid_rot
+				num_cntr_valid[container_id] += num_valid_rot
 
 		return mask
 
 
+	def snapshot(self):
+		'''
+		lightweight state to undo packing steps with restore() eg for MCTS simulations
+		containers are copied on write: only the ones changed by drop_box/replace_containers after the snapshot get saved
+		'''
+		self.cow_state = {
+			"containers"        : {},
+			"used_times"        : {container_id:val["used_times"] for container_id, val in self.container_use_times.items()},
+			"placedBox_lookUp"  : self.copy_placedBox_lookUp(self.container_placedBox_lookUp),
+			"placedBox_lookUps" : self.copy_placedBox_lookUp(self.container_placedBox_lookUps),
+			"num_packed_boxes"  : len(self.packed_boxes),
+			"current_box_id"    : self.current_box_id,
+			"suitable_container_id": self.suitable_container_id,
+		}
+		return self.cow_state
+
+	def restore(self, state):
+		'''
+		go back to the state from the latest snapshot(), which can be restored only once
+		'''
+		assert state is self.cow_state, "can only restore the latest snapshot once"
+		self.cow_state = None
+
+		for container_id, container_state in state["containers"].items():
+			self.containers[container_id].set_state(container_state)
+			self.changed_container_ids.add(container_id)
+
+		for container_id, used_times in state["used_times"].items():
+			self.container_use_times[container_id]["used_times"] = used_times
+		self.container_placedBox_lookUp  = state["placedBox_lookUp"]
+		self.container_placedBox_lookUps = state["placedBox_lookUps"]
+		del self.packed_boxes[state["num_packed_boxes"]:] # only ever appended to
+		self.current_box_id = state["current_box_id"]
+		self.suitable_container_id = state["suitable_container_id"]
+
+	@staticmethod
+	def copy_placedBox_lookUp(lookUp):
+		return {name:{"container_id":val["container_id"], "packed_boxes":list(val["packed_boxes"])} for name, val in lookUp.items()}
+
+	def _save_container(self, container_id):
+		# copy on write for snapshot(), called right before any change to the container
+		self.changed_container_ids.add(container_id)
+		if self.cow_state is not None and container_id not in self.cow_state["containers"]:
+			self.cow_state["containers"][container_id] = self.containers[container_id].get_state()
+
 	def drop_box(self, current_box_id, container_id, box, pos, actions, used_containers, check_print=False, print_mcts_sim=False):
+		self._save_container(container_id)
 		container = self.containers[container_id]
 		succeded, box_packed = container.drop_box(box, pos, check_print)
 
@@ -204,6 +249,7 @@ class ContainerSets():
 
 		# if check_print:
 		# 	print("\tcontainer{}: hmap before reset:{}".format(suitable_container_id, self.containers[suitable_container_id].height_map))
+		self._save_container(suitable_container_id)
 		self.containers[suitable_container_id].reset()
 		# if check_print:
 		# 	print("\tcontainer{}: hmap after reset:{}".format(suitable_container_id, self.containers[suitable_container_id].height_map))		
@@ -219,6 +265,20 @@ class ContainerSets():
 		combined_hwv_map = np.concatenate(combined_hwv_map, axis=0)
 		return combined_hwv_map
 
+	def write_hwv_maps(self, obs):
+		'''
+		patch get_all_containers_hwv_map() channels of obs in place, only for containers changed since the last call
+		obs: full observation or compact (height maps, scalars) one, see PackEnv.compact_obs
+		'''
+		for container_id in self.changed_container_ids:
+			container = self.containers[container_id]
+			if isinstance(obs, tuple):
+				obs[0][container_id] = container.height_map
+				obs[1][2*container_id:2*(container_id+1)] = container.free_wt, container.free_vol
+			else:
+				container.write_hwv_map(obs[3*container_id:3*(container_id+1)])
+		self.changed_container_ids = set()
+
 
 	def update_combined_hwv_map(self):
 		combined_hwv_map = []
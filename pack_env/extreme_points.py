@@ -0,0 +1,83 @@
+"""
+Extreme points (candidate corners for the next item) of a container filled by PackHeuristic
+
+    - set membership, so a corner added several times is kept once
+    - the corner a box gets placed at is dropped & never tried again
+    - with drop_covered, so are corners inside an already placed box (on insertion & when a box covering them is placed),
+      which changes packings, see config.heuristic_drop_covered_corners
+    - iterated in a configurable priority order, see config.heuristic_corner_priority
+
+LWH/XYZ convention [(0,0,0)=> Front-Left-Bottom corner]:
+    x: length       (small x = left               , large x = right)
+    y: width/depth  (small y = front (near viewer), large y = deep (away from viewer)
+    z: height       (small z = low                , large z = high)
+"""
+
+import numpy as np
+
+
+class ExtremePointSet(object):
+    # kinds of corners a placed box adds, in the order the heuristic tries them with "insertion" priority
+    RIGHT, DEEP, TOP = 0, 1, 2
+
+    def __init__(self, priority="insertion", drop_covered=False):
+        """
+        priority: "insertion" - right corners, then deep corners, then top corners, each in the order added
+                  "lowest_z"  - lowest z, then deepest y, then leftmost x
+        drop_covered: also drop corners inside placed boxes, else only the corners boxes were placed at (as the heuristic always did)
+        """
+        assert priority in ("insertion", "lowest_z"), "unknown corner priority {}".format(priority)
+        self.priority = priority
+        self.drop_covered = drop_covered
+        self.points = {} # live point => (kind, #point added) for "insertion" ordering
+        self.num_added = 0
+        self.used = set() # corners boxes were placed at
+
+        self.boxes = np.zeros((16, 6)) # placed boxes as rows [x, y, z, x+dx, y+dy, z+dz]
+        self.num_boxes = 0
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, point):
+        return point in self.points
+
+    def add(self, point, kind):
+        if point in self.points: # tried at its earliest position, like the first of its duplicates
+            self.points[point] = min(self.points[point], (kind, self.num_added))
+        elif point not in self.used and not (self.drop_covered and self.is_covered(point)):
+            self.points[point] = (kind, self.num_added)
+        self.num_added += 1
+
+    def is_covered(self, point):
+        # inside (not on the surface of) any placed box
+        x, y, z = point
+        boxes = self.boxes[:self.num_boxes]
+        return bool(np.any((boxes[:, 0] <= x) & (x < boxes[:, 3]) & (boxes[:, 1] <= y) & (y < boxes[:, 4]) & (boxes[:, 2] <= z) & (z < boxes[:, 5])))
+
+    def place_box(self, x, y, z, dx, dy, dz):
+        """
+        box placed at corner (x, y, z) with size (dx, dy, dz) along the axes: drop the corners it covers & add its own
+        """
+        if self.num_boxes == len(self.boxes):
+            self.boxes = np.concatenate([self.boxes, np.zeros(self.boxes.shape)])
+        self.boxes[self.num_boxes] = [x, y, z, x+dx, y+dy, z+dz]
+        self.num_boxes += 1
+
+        self.used.add((x, y, z))
+        self.points.pop((x, y, z), None)
+        if self.drop_covered:
+            for point in [p for p in self.points if x <= p[0] < x+dx and y <= p[1] < y+dy and z <= p[2] < z+dz]:
+                del self.points[point]
+
+        self.add((x, y, dz+z), self.TOP)
+        self.add((dx+x, y, z), self.RIGHT)
+        self.add((x, dy+y, z), self.DEEP)
+
+    def ordered(self):
+        """
+        live points in priority order
+        """
+        if self.priority == "lowest_z":
+            return sorted(self.points, key=lambda p: (p[2], -p[1], p[0]))
+        return sorted(self.points, key=self.points.get)
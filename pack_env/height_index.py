@@ -0,0 +1,174 @@
+"""
+Rectangle query index over a container's height map (XY grid of min height available for an item placement)
+
+    - 2D sparse table: max height under any (dx, dy) footprint with 4 lookups
+    - per-height summed-area tables: area of a footprint lying exactly at a given height with 4 lookups
+
+Both are built lazily for the footprints/heights actually queried & then patched only around the footprint of a placed box,
+so the height map must be changed through fill()
+
+LWH/XYZ convention [(0,0,0)=> Front-Left-Bottom corner]:
+    x: length       (small x = left               , large x = right)
+    y: width/depth  (small y = front (near viewer), large y = deep (away from viewer)
+    z: height       (small z = low                , large z = high)
+"""
+
+import numpy as np
+
+
+class HeightMapIndex(object):
+    def __init__(self, height_map, X=None, Y=None):
+        """
+        height_map: 2D array, shared with its owner (eg Container) but only changed through fill()
+        X, Y      : indexed region height_map[:X, :Y], whole map by default
+        """
+        self.height_map = height_map
+        self.X = height_map.shape[0] if X is None else X
+        self.Y = height_map.shape[1] if Y is None else Y
+
+        # both built lazily on first query & then kept patched
+        self.sparse_max = {} # sparse_max[(a, b)][x, y] = max(height_map[x:x+2**a, y:y+2**b])
+        self.level_sat  = {} # level_sat[h][x, y] = #cells of height_map[:x, :y] at height h
+
+    def rebuild(self):
+        """
+        drop everything built so far eg after height_map was changed other than through fill()
+        """
+        self.sparse_max = {}
+        self.level_sat  = {}
+
+    def get_tables(self):
+        """
+        copies of the tables built so far, to be handed back with set_tables() eg for Container snapshots
+        """
+        return {k: t.copy() for k, t in self.sparse_max.items()}, {k: t.copy() for k, t in self.level_sat.items()}
+
+    def set_tables(self, tables):
+        """
+        tables from get_tables() taken while height_map had the same content as now; not copied again
+        """
+        self.sparse_max, self.level_sat = tables
+
+    def _get_sparse_max(self, a, b):
+        """
+        table for spans (2**a, 2**b), building the ones it depends on first: (a, b-1) if b > 0 else (a-1, 0)
+        """
+        if a == 0 and b == 0:
+            return self.height_map[:self.X, :self.Y] # not cached, a view taken fresh stays in sync (also across deepcopy)
+
+        table = self.sparse_max.get((a, b))
+        if table is not None: return table
+
+        if b == 0:
+            half = 2**(a-1)
+            prev = self._get_sparse_max(a-1, 0)
+            table = np.maximum(prev[:-half], prev[half:])
+        else:
+            half = 2**(b-1)
+            prev = self._get_sparse_max(a, b-1)
+            table = np.maximum(prev[:, :-half], prev[:, half:])
+
+        self.sparse_max[(a, b)] = table
+        return table
+
+    def _get_level_sat(self, level):
+        sat = self.level_sat.get(level)
+        if sat is None:
+            hmap = self.height_map[:self.X, :self.Y]
+            sat = np.zeros((self.X+1, self.Y+1))
+            sat[1:, 1:] = np.cumsum(np.cumsum(hmap == level, axis=0), axis=1)
+            self.level_sat[level] = sat
+        return sat
+
+    def fill(self, x, y, dx, dy, h):
+        """
+        raise the footprint [x:x+dx, y:y+dy] to a flat top at max(current max under footprint, h) & patch the index around it
+        return the new height of the footprint
+        """
+        rec = self.height_map[:self.X, :self.Y][x:x+dx, y:y+dy]
+        max_h = max(np.max(rec), h)
+
+        x1, y1 = x + rec.shape[0], y + rec.shape[1] # footprint clipped to the grid
+        old_rec = rec.copy() if len(self.level_sat) > 0 else None
+        rec[...] = max_h
+
+        self._patch_sparse_max(x, y, x1, y1)
+        if old_rec is not None:
+            self._patch_level_sat(x, y, old_rec, max_h)
+        return max_h
+
+    def _patch_sparse_max(self, x0, y0, x1, y1):
+        # sorted order patches every table after the ones it depends on
+        for (a, b) in sorted(self.sparse_max.keys()):
+            table = self.sparse_max[(a, b)]
+            # entries whose span [i, i+2**a) x [j, j+2**b) overlaps the footprint
+            i0, i1 = max(0, x0 - 2**a + 1), min(table.shape[0], x1)
+            j0, j1 = max(0, y0 - 2**b + 1), min(table.shape[1], y1)
+            if i0 >= i1 or j0 >= j1: continue
+
+            if b == 0:
+                half = 2**(a-1)
+                prev = self._get_sparse_max(a-1, 0)
+                table[i0:i1, j0:j1] = np.maximum(prev[i0:i1, j0:j1], prev[i0+half:i1+half, j0:j1])
+            else:
+                half = 2**(b-1)
+                prev = self._get_sparse_max(a, b-1)
+                table[i0:i1, j0:j1] = np.maximum(prev[i0:i1, j0:j1], prev[i0:i1, j0+half:j1+half])
+
+    def _patch_level_sat(self, x0, y0, old_rec, new_h):
+        """
+        add the cumulative count change of each touched (already built) height level to the (x0, y0) lower-right quadrant of its table
+        """
+        dx, dy = old_rec.shape
+        ix = np.minimum(np.arange(self.X + 1 - (x0+1)), dx-1) # rows past the footprint carry its last cumulative row
+        iy = np.minimum(np.arange(self.Y + 1 - (y0+1)), dy-1)
+
+        for level in np.unique(np.append(old_rec, new_h)):
+            if level not in self.level_sat: continue
+            delta = (new_h == level).astype(np.float64) - (old_rec == level)
+            if not delta.any(): continue
+
+            cum_delta = np.cumsum(np.cumsum(delta, axis=0), axis=1)
+            self.level_sat[level][x0+1:, y0+1:] += cum_delta[np.ix_(ix, iy)]
+
+            if self.level_sat[level][-1, -1] == 0: # level no longer present anywhere
+                del self.level_sat[level]
+
+    def max_height(self, x, y, dx, dy):
+        """
+        max of height_map[x:x+dx, y:y+dy]; footprint assumed inside the grid
+        """
+        a, b = int(np.log2(dx)), int(np.log2(dy))
+        table = self._get_sparse_max(a, b)
+        x2, y2 = x + dx - 2**a, y + dy - 2**b
+        return max(table[x, y], table[x2, y], table[x, y2], table[x2, y2])
+
+    def area_at(self, level, x, y, dx, dy):
+        """
+        #cells of height_map[x:x+dx, y:y+dy] exactly at height level
+        """
+        sat = self._get_level_sat(level)
+        return sat[x+dx, y+dy] - sat[x, y+dy] - sat[x+dx, y] + sat[x, y]
+
+    def max_height_grid(self, dx, dy):
+        """
+        max_height for every anchor (x, y) with footprint inside the grid, shape (X-dx+1, Y-dy+1)
+        """
+        nx, ny = self.X - dx + 1, self.Y - dy + 1
+        a, b = int(np.log2(dx)), int(np.log2(dy))
+        table = self._get_sparse_max(a, b)
+        x2, y2 = dx - 2**a, dy - 2**b
+        return np.maximum(np.maximum(table[:nx, :ny], table[x2:x2+nx, :ny]),
+                          np.maximum(table[:nx, y2:y2+ny], table[x2:x2+nx, y2:y2+ny]))
+
+    def area_at_grid(self, levels, dx, dy):
+        """
+        area_at for every anchor (x, y) with levels given per anchor eg from max_height_grid
+        """
+        area = np.zeros(levels.shape)
+        for level in np.unique(levels):
+            sat = self._get_level_sat(level)
+            at_level = (levels == level)
+            window_sum = sat[dx:, dy:] - sat[:-dx, dy:] - sat[dx:, :-dy] + sat[:-dx, :-dy]
+            area[at_level] = window_sum[at_level]
+        return area
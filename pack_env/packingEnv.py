@@ -2,19 +2,23 @@ import numpy as np
 import copy
 import time, sys
 
-from .box import Box
+from .box import Box, BoxArray
 from .container import Container
 from .container_sets import ContainerSets
+from .catalogue import CATALOGUE
 from .box_seq_generator import CuttingBoxSeqCreator, PredictionBoxSeqCreator
 
 sys.path.append("../")
 import config
 
 class PackEnv():
-    def __init__(self, datagen_mode="train", customer_order_list=None, init_container_ids_list=None, **kwargs):
-
+    def __init__(self, datagen_mode="train", customer_order_list=None, init_container_ids_list=None, order_boxes=None, **kwargs):
+        '''
+        order_boxes: customer_order_list as a BoxArray if already built (predict mode), for the order's totals
+        '''
         self.datagen_mode        = datagen_mode
         self.customer_order_list = customer_order_list
+        self.order_boxes         = order_boxes
         self.init_container_ids_list = init_container_ids_list
         self.sort_init_container_ids()
 
@@ -49,7 +53,7 @@ class PackEnv():
         elif self.datagen_mode == "test":
             self.boxSeqGenerator = TestingBoxSeqCreator()                                           
         else:
-            self.boxSeqGenerator = PredictionBoxSeqCreator(self.customer_order_list)                               
+            self.boxSeqGenerator = PredictionBoxSeqCreator(self.customer_order_list, order_boxes=self.order_boxes)                               
 
         self.container_sets_status = ContainerSets(self.boxSeqGenerator.box_list)
 
@@ -60,6 +64,17 @@ class PackEnv():
 
         self.current_container = self.init_container_ids_list[0]
 
+        # model input, patched in place by write_observation(): per container hwv maps, current box, remaining boxes, mask
+        # as (channel, max_X, max_Y) or with config.compact_obs as (height maps, scalars) leaving the mask to current_box_mask
+        self.compact_obs = config.compact_obs
+        self.current_obs = None
+        self.obs_box = self.obs_remaining = self.obs_mask = None # views of current_obs
+        self.unpacked_wt  = 0. # total weight & volume of boxes not packed yet, including the current box
+        self.unpacked_vol = 0.
+        self.box_types = None # distinct boxes (size & weight) of the order, see BoxArray.distinct_boxes
+        self.box_type_ids = {} # id(box) => index of its distinct box in box_types & remaining_counts
+        self.remaining_counts = None # boxes not packed yet per distinct box, including the current box
+
 
     def reset(self, check_print=False, mode_mcts_sim=True):
 
@@ -68,7 +83,7 @@ class PackEnv():
         elif self.datagen_mode == "test":
             self.boxSeqGenerator = TestingBoxSeqCreator()                                           
         else:
-            self.boxSeqGenerator = PredictionBoxSeqCreator(self.customer_order_list)                               
+            self.boxSeqGenerator = PredictionBoxSeqCreator(self.customer_order_list, order_boxes=self.order_boxes)                               
 
         self.container_sets_status = ContainerSets(self.boxSeqGenerator.box_list)
 
@@ -80,19 +95,66 @@ class PackEnv():
         self.sort_init_container_ids()
         self.current_container = self.init_container_ids_list[0]
 
+        self._init_observation() # containers get written in full as all are new
+        self.unpacked_wt  = self.boxSeqGenerator.boxes.total_weight()
+        self.unpacked_vol = self.boxSeqGenerator.boxes.total_volume()
+        self.remaining_counts = np.bincount(self._index_box_types())
+
         self.set_cur_observation_vals(check_print, mode_mcts_sim)
 
+    def _index_box_types(self):
+        '''
+        set box_types & box_type_ids for the boxes of box_list, returns each one's distinct box index
+        rotation doesn't change a box's index, so packed boxes get the same one as at reset()
+        '''
+        box_list = self.boxSeqGenerator.box_list
+        self.box_types, type_ids = BoxArray.from_boxes(box_list).distinct_boxes()
+        self.box_type_ids = {id(b):type_id for b, type_id in zip(box_list, type_ids.tolist())}
+        return type_ids
+
+    def __setstate__(self, state):
+        # boxes & arrays are new objects when unpickled or deep-copied (eg sent to mcts.parallel workers): boxes get indexed again
+        # & the views of current_obs taken again, copies of them wouldn't write into it
+        self.__dict__.update(state)
+        if state.get("remaining_counts") is not None:
+            self._index_box_types()
+        if state.get("current_obs") is not None:
+            self._observation_views()
+
+    def snapshot(self):
+        '''
+        lightweight alternative to copy.deepcopy(env) for simulations: step() freely, then restore() the returned state
+        only containers touched by step() get copied (see ContainerSets.snapshot), boxes keep just their packing attributes
+        current_obs is patched in place, so copy it to keep an observation across step()/restore()
+        '''
+        box_list = self.boxSeqGenerator.box_list
+        return {
+            "container_sets": self.container_sets_status.snapshot(),
+            "box_list"      : list(box_list), # order can change when shuffling items
+            "box_states"    : [b.pack_state() for b in box_list],
+            "env"           : (self.current_box_id, self.packed_box_counter, list(self.used_containers), self.current_container,
+                                self.current_box, self.current_box_mask, self.unpacked_wt, self.unpacked_vol, self.remaining_counts.copy(), getattr(self, "current_packed_box", None)),
+        }
+
+    def restore(self, state):
+        '''
+        go back to the state of the latest snapshot(), which can be restored only once
+        '''
+        self.container_sets_status.restore(state["container_sets"])
+
+        self.boxSeqGenerator.box_list = state["box_list"]
+        for b, box_state in zip(state["box_list"], state["box_states"]):
+            b.set_pack_state(box_state)
+
+        self.current_box_id, self.packed_box_counter, self.used_containers, self.current_container, \
+            self.current_box, self.current_box_mask, self.unpacked_wt, self.unpacked_vol, self.remaining_counts, self.current_packed_box = state["env"]
+        self.write_observation()
+
     def sort_init_container_ids(self):
         '''
         biggest to smallest container
         '''
-        v = []
-        for container_id in self.init_container_ids_list:
-            vol = config.CONTAINERS_CONFIG["container_details"][container_id]["max_vol"]
-            v.append([container_id, vol])
-        v.sort(key = lambda x: x[1])
-        v = v[::-1]
-        self.init_container_ids_list = [v_[0] for v_ in v]
+        self.init_container_ids_list = CATALOGUE.by_volume(self.init_container_ids_list)[::-1]
 
 
     def step(self, action, check_print=False, mode_mcts_sim=True):
@@ -102,9 +164,7 @@ class PackEnv():
 
         # current box to be placed
         box = self.current_box
-        if (rotation == box.rotate_XY): box.dx, box.dy = box.dy, box.dx # 1: X<->Y
-        if (rotation == box.rotate_XZ): box.dx, box.dz = box.dz, box.dx # 2: X<->Z
-        if (rotation == box.rotate_YZ): box.dy, box.dz = box.dz, box.dy # 3: Y<->Z
+        box.rotate(rotation) # 1: X<->Y, 2: X<->Z, 3: Y<->Z
 
         succeeded, box_packed = self.container_sets_status.drop_box(self.current_box_id, container_id, box, (x,y), selected_actions, self.used_containers, check_print, mode_mcts_sim)
 
@@ -112,6 +172,9 @@ class PackEnv():
             self.current_packed_box = box_packed
             self.current_box_id += 1
             self.packed_box_counter += 1
+            self.unpacked_wt  -= box.wt
+            self.unpacked_vol -= box.vol()
+            self.remaining_counts[self.box_type_ids[id(box)]] -= 1
 
             self.used_containers.append(container_id)
             self.used_containers = list(set(self.used_containers))
@@ -169,9 +232,7 @@ class PackEnv():
                         rb_name = self.boxSeqGenerator.box_list[box_id].name
                         print("\t\tshuffling:  ids:{}<=>{}, names:{}<=>{}".format(self.current_box_id, box_id, cb_name, rb_name))
 
-                    print("b4", [b.name for b in self.boxSeqGenerator.box_list])
                     self.boxSeqGenerator.reset_box_list(self.current_box_id, box_id, check_print)
-                    print("after", [b.name for b in self.boxSeqGenerator.box_list])
 
                     replace_containers_flag = False
                     break
@@ -193,18 +254,63 @@ class PackEnv():
             assert np.sum(self.current_box_mask) > 0.0, "couldn't find any suitable new container, check current box dims"
 
         self.current_box  = self.boxSeqGenerator.box_list[self.current_box_id]
-        remainingBoxes    = self.boxSeqGenerator.box_list[self.current_box_id+1:]
+        self.current_box_mask = self.current_box_mask.reshape(-1, )
+
+        self.write_observation()
+
+    def write_observation(self):
+        '''
+        model input for CNN, patched in place: only containers changed since the last call, the current box, remaining boxes & mask
+        '''
+        obs = self.current_obs
+        self.container_sets_status.write_hwv_maps(obs) # current state of packing of all containers
+        self.write_box_hwv_map(self.obs_box, self.current_box)
 
+        if self.current_box_id+1 < len(self.boxSeqGenerator.box_list):
+            remaining_weights = self.unpacked_wt - self.current_box.wt
+            remaining_volumes = self.unpacked_vol - self.current_box.vol()
+        else:
+            remaining_weights = 0.
+            remaining_volumes = 0.
+        self.obs_remaining[0] = np.float32(remaining_weights)
+        self.obs_remaining[1] = np.float32(remaining_volumes)/20
 
-        # ##### model input for CNN
-        combined_hwv_map      = self.container_sets_status.get_all_containers_hwv_map() # current state of packing of all containers
-        current_box_hwv_map   = self.get_box_hwv_map(self.current_box)
-        remainingBoxes_wv_map = self.remainingBoxes_wv_map(remainingBoxes)
+        if self.obs_mask is not None:
+            self.obs_mask[...] = self.current_box_mask.reshape(-1, self.max_X, self.max_Y)
 
-        current_box_mask = self.current_box_mask.reshape(-1, self.max_X, self.max_Y)
-        self.current_obs = np.concatenate([combined_hwv_map, current_box_hwv_map, remainingBoxes_wv_map, current_box_mask], axis=0)
+    def _init_observation(self):
+        if self.compact_obs:
+            self.current_obs = (np.zeros((config.map_channel, self.max_X, self.max_Y)), np.zeros(config.num_scalars))
+        else:
+            self.current_obs = np.zeros((config.channel, self.max_X, self.max_Y))
+        self._observation_views()
+
+    def _observation_views(self):
+        # obs_box, obs_remaining & obs_mask as views of current_obs
+        n = self.num_containers
+        if self.compact_obs:
+            scalars = self.current_obs[1]
+            self.obs_box, self.obs_remaining, self.obs_mask = scalars[2*n:2*n+5], scalars[2*n+5:], None
+        else:
+            obs = self.current_obs
+            self.obs_box, self.obs_remaining, self.obs_mask = obs[3*n:3*n+5], obs[3*n+5:3*n+7], obs[3*n+7:]
 
-        self.current_box_mask = current_box_mask.reshape(-1, )
+    def observation(self):
+        '''
+        copy of current_obs to keep across step()/restore()
+        '''
+        if self.compact_obs:
+            return tuple(o.copy() for o in self.current_obs)
+        return self.current_obs.copy()
+
+    @staticmethod
+    def stack_observations(obs_list):
+        '''
+        batch of observations from observation() eg for NNetWrapper.predict_batch
+        '''
+        if isinstance(obs_list[0], tuple):
+            return tuple(np.stack(o) for o in zip(*obs_list))
+        return np.stack(obs_list)
 
     def get_current_box_mask(self, box_id):
         # num_items = len(self.customer_order_list)
@@ -224,26 +330,12 @@ class PackEnv():
         # print("=>", current_box_mask.shape, np.sum(current_box_mask), len(current_box_mask))
         return current_box_mask
 
-    def get_box_hwv_map(self, box):
-        x_plain   = np.ones((self.max_X, self.max_Y), dtype=np.int32) * box.dx
-        y_plain   = np.ones((self.max_X, self.max_Y), dtype=np.int32) * box.dy
-        z_plain   = np.ones((self.max_X, self.max_Y), dtype=np.int32) * box.dz
-        wt_plain  = np.ones((self.max_X, self.max_Y), dtype=np.float32) * box.wt
-        vol_plain = np.ones((self.max_X, self.max_Y), dtype=np.float32) * box.vol()/20 # (box.dx*box.dy*box.dz)
-
-        return np.stack([x_plain, y_plain, z_plain, wt_plain, vol_plain], axis=0)
-
-    def remainingBoxes_wv_map(self, boxes):
-        if len(boxes) > 0:
-            remaining_weights = sum([b.wt for b in boxes])
-            remaining_volumes = sum([b.vol() for b in boxes])
-        else:
-            remaining_weights = 0.
-            remaining_volumes = 0.
-
-        remaining_wmap = np.ones((self.max_X, self.max_Y), dtype=np.float32) * remaining_weights
-        remaining_vmap = np.ones((self.max_X, self.max_Y), dtype=np.float32) * remaining_volumes/20
-    
-        return np.stack([remaining_wmap, remaining_vmap], axis=0)
+    def write_box_hwv_map(self, out, box):
+        # out: 5 planes or 5 scalars; wt & vol at float32 precision like the planes they replace
+        out[0] = box.dx
+        out[1] = box.dy
+        out[2] = box.dz
+        out[3] = np.float32(box.wt)
+        out[4] = np.float32(box.vol())/20 # (box.dx*box.dy*box.dz)
 
 
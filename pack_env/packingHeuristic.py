@@ -2,13 +2,23 @@ import numpy as np
 import copy
 import time, sys
 
-from .box import Box
+from .box import Box, distinct_rotations
+from .catalogue import CATALOGUE
 from .container import Container
 from .container_sets import ContainerSets
+from .height_index import HeightMapIndex
+from .extreme_points import ExtremePointSet
 
 sys.path.append("../")
 import config
 
+
+def item_rotations(l, w, h, dx, dy, dz):
+	'''
+	((rotation, (footprint along X, along Y, height)), ...) of an item as placed by the heuristic, distinct orientations only
+	'''
+	return distinct_rotations(((dx, dy, h), (dy, dx, h), (dz, dy, l), (dx, dz, w)))
+
 class PackHeuristic():
 	def __init__(self, items_info, input_box_list, print_t=False):
 		'''
@@ -29,28 +39,27 @@ class PackHeuristic():
 		self.items_partition_info = []
 
 	@staticmethod
-	def update_height_map(hmap, x, y, z, dx, dy, dz):
-		max_h = np.max(hmap[x:x+dx, y:y+dy])
-		max_h = max(max_h, z + dz)
-		hmap[x:x+dx, y:y+dy] = max_h
-		return hmap
+	def update_height_map(height_index, x, y, z, dx, dy, dz):
+		# height_index: HeightMapIndex over the container's height map, patched in place
+		height_index.fill(x, y, dx, dy, z + dz)
+		return height_index
 	
 	@staticmethod
-	def check_valid_placement(hmap, x, y, z, dx, dy, dz, container_dx, container_dy, container_dz):
+	def check_valid_placement(height_index, x, y, z, dx, dy, dz, container_dx, container_dy, container_dz):
 		if x + dx > container_dx or y + dy > container_dy: return False
 		if x < 0 or y < 0: return False
 
-		rec = hmap[x:x+dx, y:y+dy]
-		r00 = rec[ 0, 0]
-		r10 = rec[-1, 0]
-		r01 = rec[ 0,-1]
-		r11 = rec[-1,-1]
+		hmap = height_index.height_map
+		r00 = hmap[x     , y     ]
+		r10 = hmap[x+dx-1, y     ]
+		r01 = hmap[x     , y+dy-1]
+		r11 = hmap[x+dx-1, y+dy-1]
 		rm = max(r00,r10,r01,r11)
 		supportedCorners = int(r00==rm)+int(r10==rm)+int(r01==rm)+int(r11==rm)
 		if supportedCorners < config.min_supported_corners:
 		    return False
 
-		max_h = np.max(rec) # box base height if placed here
+		max_h = height_index.max_height(x, y, dx, dy) # box base height if placed here
 		assert max_h >= 0
 		if max_h + dz > container_dz:
 			return False
@@ -60,35 +69,30 @@ class PackHeuristic():
 	def check_packing(self):
 
 		some_invalid_item = False
+		if config.single_sku_heuristic and self.pack_single_sku():
+			self.ids_left_to_pack = []
+
 		while len(self.ids_left_to_pack) > 0 and not some_invalid_item:
 			# print("items_left_to_pack:{}, ids:{}".format(len(self.ids_left_to_pack), self.ids_left_to_pack))
 
+			# greedily grow one container's items: keep each next item if all kept ones + it still fit in a single container
+			search = self.init_packing_search()
 			keep_recent = [None]
-			ids_packed = []
 			cant_be_packed = []
-			for i in range(1, len(self.ids_left_to_pack)+1):
-				ids = [self.ids_left_to_pack[j] for j in range(i) if self.ids_left_to_pack[j] not in cant_be_packed]
-				current_items_info = [self.items_info[j] for j in  ids]
-				current_input_box_list = [self.input_box_list[j] for j in  ids]
+			for item_id in self.ids_left_to_pack:
+				pack_info = self.extend_packing(search, item_id)
 
-				packed, pack_info = self.check_packing_single_container(current_items_info, current_input_box_list)
-				# print("\t i:{} ids:{}, cant_be_packed:{}".format(i, ids, cant_be_packed))
-
-				if packed:
-					ids_packed = ids
+				if pack_info is not None:
 					keep_recent.append(pack_info)
-					# container_name = [k for k in pack_info.keys()][0]
-					# print("\t\t packed => ids:{}, len:{}".format(ids, len(pack_info[container_name]["packed_boxes"])))					
 				else:
-					# print("\t\t\t can't be packed", ids[-1])
-					cant_be_packed.append(ids[-1])
+					cant_be_packed.append(item_id)
 
-			# print("can be packed:{}, cant be packed:{}".format(ids_packed, cant_be_packed))
+			# print("can be packed:{}, cant be packed:{}".format(search["ids"], cant_be_packed))
 			if len(cant_be_packed) == len(self.ids_left_to_pack):
 				some_invalid_item = True
 
 			self.ids_left_to_pack = cant_be_packed
-			self.items_partition_info.append([ids_packed, keep_recent[-1]])
+			self.items_partition_info.append([search["ids"], keep_recent[-1]])
 
 		if len(self.ids_left_to_pack) > 0:
 			# in case some LWH or wt violation leading to some item just cant be packed
@@ -119,14 +123,118 @@ class PackHeuristic():
 
 
 
-	def check_packing_single_container(self, items_info, input_box_list):
+	def pack_single_sku(self):
+		'''
+		closed form packing when all items are the same (dims & weight): each container holds the same grid of items in its best rotation,
+		so fill as many of the highest capacity container as needed & put the rest in the smallest container holding them
+		fills items_partition_info as check_packing does, False if not a single SKU order or it can't be packed this way
+		'''
+		if len(self.items_info) == 0:return False # nothing to pack, left to the general path
+		item = self.items_info[0]
+		if any(tuple(other[:7]) != tuple(item[:7]) for other in self.items_info):return False
+
+		l, w, h, dx, dy, dz, wt = item[:7]
+		if not (wt >= 0):return False # eg missing weight
+		vol = dx*dy*h # as in check_packing_single_container
+		rotation_dims = dict(item_rotations(l, w, h, dx, dy, dz)) # rotation => (footprint along X, Y & height)
+
+		capacities = [] # [container_id, #items, rotation, #items along X, #items along Y, layer heights]
+		for (cid, _, _, _, max_weight), max_vol in zip(CATALOGUE.limits, CATALOGUE.vols):
+			cntr_info = config.CONTAINERS_CONFIG["container_details"][cid]
+
+			best = None
+			for rotation, (fx, fy, fz) in rotation_dims.items():
+				if fx <= 0 or fy <= 0 or fz <= 0:continue
+				nx, ny = cntr_info["X"] // fx, cntr_info["Y"] // fy
+				layers = [] # z of each layer, summed up the same way as stacked corners
+				z = 0
+				while nx*ny > 0 and z + fz <= cntr_info["H"]:
+					layers.append(z)
+					z += fz
+				if best is None or nx*ny*len(layers) > best[1]:
+					best = [cid, nx*ny*len(layers), rotation, nx, ny, layers]
+
+			num_items = best[1]
+			if wt > 0:
+				num_items = min(num_items, int(max_weight // wt))
+			if vol > 0:
+				num_items = min(num_items, int(max_vol // vol))
+			while num_items > 0 and (num_items*wt > max_weight or num_items*vol > max_vol):num_items -= 1
+			if num_items > 0:
+				capacities.append([cid, num_items] + best[2:])
+
+		if len(capacities) == 0:return False
+
+		# capacities is smallest to biggest container, so ties go to the smaller one
+		num_left = len(self.ids_left_to_pack)
+		biggest = max(capacities, key=lambda x: x[1])
+		assignment = [biggest]*(num_left // biggest[1])
+		if num_left % biggest[1] > 0:
+			assignment.append([c for c in capacities if c[1] >= num_left % biggest[1]][0])
+
+		start = 0
+		for capacity in assignment:
+			cid, num_items, rotation, nx, ny, layers = capacity
+			ids = self.ids_left_to_pack[start:start+num_items]
+			start += len(ids)
+
+			xyz_pos_rot = [[(i % nx)*rotation_dims[rotation][0], ((i // nx) % ny)*rotation_dims[rotation][1], layers[i // (nx*ny)], rotation] for i in range(len(ids))]
+			placed_container_name = config.CONTAINERS_CONFIG["container_details"][cid]["name"] + "(1)"
+			pack_info = self.apply_packing({"cid":cid, "xyz_pos_rot":xyz_pos_rot}, [self.items_info[j] for j in ids], [self.input_box_list[j] for j in ids], placed_container_name)
+			self.items_partition_info.append([ids, pack_info])
 
-		cntr_details = [[container_id, cntr_info["L"], cntr_info["W"], cntr_info["H"], cntr_info["max_weight"], cntr_info["max_vol"]] \
-							for container_id, cntr_info in config.CONTAINERS_CONFIG["container_details"].items()]
-		# cntr_details = [[container_id, cntr_info["X"], cntr_info["Y"], cntr_info["H"], cntr_info["max_weight"], cntr_info["max_vol"]] \
-		# 					for container_id, cntr_info in config.CONTAINERS_CONFIG["container_details"].items()]
+		return True
 
-		cntr_details.sort(key=lambda x: x[5])
+	def init_packing_search(self):
+		'''
+		state for extend_packing(): items kept so far & their aggregates, packing of the kept items per container
+		'''
+		return {"ids":[], "max_X":0, "max_Y":0, "max_Z":0, "combined_vol":0, "combined_W":0,
+				"containers":{}, # container id => init_single_container() state of (a prefix of) the kept items, None if they don't fit
+				"rejected":set()} # items (by dims & weight) that didn't fit along with the current kept items
+
+	def extend_packing(self, search, item_id):
+		'''
+		same as check_packing_single_container() for the kept items + item_id, but each container's packing of the kept items is
+		extended from the previous calls instead of being redone from an empty container
+		on success item_id gets kept & the packing info is returned, else None
+		'''
+		item = self.items_info[item_id]
+		item_key = tuple(item[:7])
+		if item_key in search["rejected"]: return None # identical item to one that didn't fit since kept items last changed
+
+		max_X = max(search["max_X"], item[3])
+		max_Y = max(search["max_Y"], item[4])
+		max_Z = max(search["max_Z"], item[2])
+		combined_vol = search["combined_vol"] + item[3]*item[4]*item[2]
+		combined_W = search["combined_W"] + item[6]
+
+		ids = search["ids"]
+		for cid in CATALOGUE.holding(max_X, max_Y, max_Z, combined_W, combined_vol):
+			state = search["containers"].get(cid, False)
+			if state is None:continue # some kept items already didn't fit, so won't with more items either
+			if state is False:
+				state = search["containers"][cid] = self.init_single_container(cid)
+
+			# catch up with items kept since this container was last checked
+			while len(state["xyz_pos_rot"]) < len(ids):
+				if not self.place_item(state, self.items_info[ids[len(state["xyz_pos_rot"])]]):
+					state = search["containers"][cid] = None
+					break
+			if state is None:continue
+
+			if self.place_item(state, item):
+				ids.append(item_id)
+				search.update({"max_X":max_X, "max_Y":max_Y, "max_Z":max_Z, "combined_vol":combined_vol, "combined_W":combined_W})
+				search["rejected"] = set()
+
+				placed_container_name = config.CONTAINERS_CONFIG["container_details"][cid]["name"] + "(1)"
+				return self.apply_packing(state, [self.items_info[j] for j in ids], [self.input_box_list[j] for j in ids], placed_container_name)
+
+		search["rejected"].add(item_key)
+		return None
+
+	def check_packing_single_container(self, items_info, input_box_list):
 
 		max_X = max([item[3] for item in items_info])
 		max_Y = max([item[4] for item in items_info])
@@ -135,9 +243,7 @@ class PackHeuristic():
 		combined_W = sum([item[6] for item in items_info])
 
 		### When a single box is enough and be trivially verified fast - find the one with smallest volume ###
-		suitable_single_container_ids = [container[0] for container in cntr_details \
-											if (combined_vol <= container[5]) and (combined_W <= container[4]) \
-												and (max_X <= container[1]) and (max_Y <= container[2]) and (max_Z <= container[3])]
+		suitable_single_container_ids = CATALOGUE.holding(max_X, max_Y, max_Z, combined_W, combined_vol)
 
 		if len(suitable_single_container_ids) > 0:
 			for cid in suitable_single_container_ids:
@@ -150,111 +256,77 @@ class PackHeuristic():
 		return False, None
 
 	def pack_in_single_container(self, items_info, input_box_list, cid, placed_container_name):
+		state = self.init_single_container(cid)
+		for i in range(len(items_info)):
+			if not self.place_item(state, items_info[i]):
+				return False, None
 
-		max_X = max([item[3] for item in items_info])
-		max_Y = max([item[4] for item in items_info])
-		max_Z = max([item[2] for item in items_info])	
-		combined_Z = sum([item[2] for item in items_info])
-		combined_W = sum([item[6] for item in items_info])
-		combined_vol = sum([item[3]*item[4]*item[2] for item in items_info])	
+		return True, self.apply_packing(state, items_info, input_box_list, placed_container_name)
 
+	def init_single_container(self, cid):
+		'''
+		empty container cid to be filled by place_item()
+		'''
 		container = config.CONTAINERS_CONFIG["container_details"][cid]
-		packing_info = {placed_container_name:{"container_id":cid, "packed_boxes":[]}}
+		corners = ExtremePointSet(config.heuristic_corner_priority, config.heuristic_drop_covered_corners)
+		corners.add((0,0,0), corners.TOP)
+		return {"cid":cid, "height_map":HeightMapIndex(np.zeros((container["X"], container["Y"]))), "xyz_pos_rot":[], "corners":corners}
 
+	def place_item(self, state, item):
+		'''
+		place item at the first corner it fits, trying rotations in order; False if it fits nowhere (state unchanged)
+		'''
+		container = config.CONTAINERS_CONFIG["container_details"][state["cid"]]
 		cntr_dx, cntr_dy, cntr_dz = container["X"], container["Y"],  container["H"]
-		height_map = np.zeros((cntr_dx, cntr_dy))
+		height_map  = state["height_map"]
+		xyz_pos_rot = state["xyz_pos_rot"]
+		corners = state["corners"]
 
-		xyz_pos_rot = []
-		used_points = []
+		l, w, h, dx, dy, dz = item[:6]
+		rotations = item_rotations(l, w, h, dx, dy, dz)
 
-		flb_corners = [(0,0,0)]
-		re_corners  = []
-		fu_corners = [] 
-		for i in range(len(items_info)):
-			l, w, h, dx, dy, dz = items_info[i][:6]
-
-			# avbl_corners = flb_corners + re_corners + fu_corners
-			avbl_corners = re_corners + fu_corners + flb_corners
-			avbl_corners = [corner for corner in avbl_corners if corner not in used_points]
-
-			# if i <= 5:
-			# 	print(flb_corners, ">", re_corners, ">", fu_corners, ">u<", used_points, "=", avbl_corners)
-
-			item_packed = False
-
-			for j in range(len(avbl_corners)):
-				x,y,z = avbl_corners[j]
-
-				cndn_1 = dx + x <= container["X"] and dy + y <= container["Y"] and h + z <= container["H"] # without rotation
-				cndn_2 = dy + x <= container["X"] and dx + y <= container["Y"] and h + z <= container["H"] # X-Y rotation
-				cndn_3 = dz + x <= container["X"] and dy + y <= container["Y"] and dx + z <= container["H"] # X-Z rotation
-				cndn_4 = dx + x <= container["X"] and dz + y <= container["Y"] and dy + z <= container["H"] # Y-Z rotation
-
-				check_valid = self.check_valid_placement(height_map, x, y, z, dx, dy, h, cntr_dx, cntr_dy, cntr_dz)
-
-				if check_valid:
-					if cndn_1 or cndn_2 or cndn_3 or cndn_4:
-						# if i <= 5:
-						# 	print("\t", (x,y,z))
-						item_packed = True
-						used_points.append((x,y,z))
-						
-					if cndn_1:
-						xyz_pos_rot.append([x, y, z, 0])
-						flb_corners.append((x, y, h+z))
-						re_corners.append((dx+x, y, z))
-						fu_corners.append((x, dy+y, z))
-						height_map = self.update_height_map(height_map, x, y, z, dx, dy, h)		
-						break
-					elif cndn_2:
-						xyz_pos_rot.append([x, y, z, 1])
-						flb_corners.append((x, y, h+z))
-						re_corners.append((dy+x, y, z))
-						fu_corners.append((x, dx+y, z))
-						height_map = self.update_height_map(height_map, y, x, z, dx, dy, h)																								
-						break
-					elif cndn_3:
-						xyz_pos_rot.append([x, y, z, 2])
-						flb_corners.append((x, y, l+z))
-						re_corners.append((dz+x, y, z))
-						fu_corners.append((x, dy+y, z))
-						height_map = self.update_height_map(height_map, z, y, x, dz, dy, l)																											
-						break
-					elif cndn_4:
-						xyz_pos_rot.append([x, y, z, 3])
-						flb_corners.append((x, y, w+z))
-						re_corners.append((dx+x, y, z))
-						fu_corners.append((x, dz+y, z))
-						height_map = self.update_height_map(height_map, x, z, y, dx, dz, w)											
-						break
-
-			if not item_packed:
-				break
-
-		if len(xyz_pos_rot) == len(items_info):
-			for i in range(len(items_info)):
-				l,w,h,dx,dy,dz = items_info[i][:6]
-
-				box =  input_box_list[i]
-				box.pack_cntr_id = cid
-				box.pack_cntr_name = placed_container_name
-				box.pack_cntr_size = (container["L"], container["W"], container["H"])
-				box.x = xyz_pos_rot[i][0]
-				box.y = xyz_pos_rot[i][1]
-				box.z = xyz_pos_rot[i][2]				
-				box.pack_rot = xyz_pos_rot[i][3]
-
-				if xyz_pos_rot[i][3] == 1: # X<->Y
-					box.dx, box.dy = box.dy, box.dx
-				elif xyz_pos_rot[i][3] == 2: # X<->Z
-					box.dx, box.dz = box.dz, box.dx
-				elif xyz_pos_rot[i][3] == 3: # Y<->Z
-					box.dy, box.dz = box.dz, box.dy
-													
-				packing_info[placed_container_name]["packed_boxes"].append(box)
-
-			return True, packing_info
+		for (x,y,z) in corners.ordered():
 
-		return False, None
+			check_valid = self.check_valid_placement(height_map, x, y, z, dx, dy, h, cntr_dx, cntr_dy, cntr_dz)
+			if not check_valid:continue
+
+			for rotation, (fx, fy, fz) in rotations:
+				if fx + x <= cntr_dx and fy + y <= cntr_dy and fz + z <= cntr_dz:
+					xyz_pos_rot.append([x, y, z, rotation])
+					corners.place_box(x, y, z, fx, fy, fz)
+					# height map patched per rotation as it always has been
+					fill = ((x, y, z, dx, dy, h), (y, x, z, dx, dy, h), (z, y, x, dz, dy, l), (x, z, y, dx, dz, w))[rotation]
+					self.update_height_map(height_map, *fill)
+					return True
 
+		return False
 
+	def apply_packing(self, state, items_info, input_box_list, placed_container_name):
+		'''
+		set the placements of state on the boxes of input_box_list & return them as packing info
+		'''
+		cid = state["cid"]
+		xyz_pos_rot = state["xyz_pos_rot"]
+		container = config.CONTAINERS_CONFIG["container_details"][cid]
+		packing_info = {placed_container_name:{"container_id":cid, "packed_boxes":[]}}
+
+		for i in range(len(items_info)):
+			box =  input_box_list[i]
+			box.pack_cntr_id = cid
+			box.pack_cntr_name = placed_container_name
+			box.pack_cntr_size = (container["L"], container["W"], container["H"])
+			box.x = xyz_pos_rot[i][0]
+			box.y = xyz_pos_rot[i][1]
+			box.z = xyz_pos_rot[i][2]				
+			box.pack_rot = xyz_pos_rot[i][3]
+
+			if xyz_pos_rot[i][3] == 1: # X<->Y
+				box.dx, box.dy = box.dy, box.dx
+			elif xyz_pos_rot[i][3] == 2: # X<->Z
+				box.dx, box.dz = box.dz, box.dx
+			elif xyz_pos_rot[i][3] == 3: # Y<->Z
+				box.dy, box.dz = box.dz, box.dy
+												
+			packing_info[placed_container_name]["packed_boxes"].append(box)
+
+		return packing_info
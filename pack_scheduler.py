@@ -0,0 +1,72 @@
+'''
+Asyncio scheduler in front of the packing processes, with a latency budget per order
+	- the heuristic packing comes back first, handed to on_provisional as provisional result of orders RL packing goes on to improve
+	- orders that qualify for RL packing (see predict.use_rl_packing) get improved by it within what's left of the budget,
+	  starting from that heuristic packing & the search being spread over the order's items to finish by the deadline
+	  (see mcts.monteCarlo.SearchBudget)
+	- the packing process itself stops searching at the deadline & hands back the best packing so far, so it's free for
+	  the next order within ORDER_DEADLINE_GRACE
+'''
+import asyncio, time, functools
+
+import config
+import predict
+
+
+class PackScheduler():
+	def __init__(self, executor, frozen_model=False, packing_cache=None, budget=config.ORDER_LATENCY_BUDGET):
+		'''
+		executor: concurrent.futures executor of packing processes eg the warm pool of pack_service.PackingService
+		budget  : default seconds per order, None to always finish RL packing
+		'''
+		self.executor = executor
+		self.frozen_model = frozen_model
+		self.packing_cache = packing_cache
+		self.budget = budget
+
+	def _run(self, payload, use_rl=True, deadline=None, **kwargs):
+		task = functools.partial(predict.pack_orders, [payload], self.frozen_model, packing_cache=self.packing_cache, use_rl=use_rl, deadline=deadline, **kwargs)
+		return asyncio.get_event_loop().run_in_executor(self.executor, task) # the running loop, get_running_loop is python 3.7+
+
+	async def pack(self, payload, budget=None, on_provisional=None):
+		'''
+		payload: (proc_id, order_id, item_ids, order_qtys, item_dims) as for predict.pack_orders
+		on_provisional(result): called with the heuristic result when RL packing starts to improve on it, not for orders packed in one go
+		returns [proc_id, time_taken, num_containers, used_containers, container-wise packing-info] like predict.pack_order_items
+		'''
+		budget = self.budget if budget is None else budget
+		if budget is None:
+			return (await self._run(payload))[0]
+
+		deadline = time.time() + budget
+		result = (await self._run(payload, use_rl=False, deadline=deadline, keep_heuristic=True))[0]
+		result, heuristic = result[:-1], result[-1]
+
+		# heuristic is None if RL packing can't improve on it (or the result came from the cache)
+		if heuristic is None or time.time() >= deadline:
+			return result
+
+		if on_provisional is not None:
+			on_provisional(result)
+
+		try:
+			# the packing process stops at the deadline itself, the grace is for its last simulation & handing back the result,
+			# so this only gives up on a process that's stuck
+			return (await asyncio.wait_for(self._run(payload, deadline=deadline, heuristic=heuristic), deadline - time.time() + config.ORDER_DEADLINE_GRACE))[0]
+		except asyncio.TimeoutError:
+			return result
+
+	async def pack_all(self, payloads, budgets=None, on_provisional=None, on_final=None):
+		'''
+		orders packed concurrently, results in the order of payloads
+		on_provisional(result), on_final(result): called per order as its results come, see pack
+		'''
+		budgets = [None]*len(payloads) if budgets is None else budgets
+
+		async def pack(payload, budget):
+			result = await self.pack(payload, budget, on_provisional)
+			if on_final is not None:
+				on_final(result)
+			return result
+
+		return await asyncio.gather(*[pack(payload, budget) for payload, budget in zip(payloads, budgets)])
@@ -0,0 +1,207 @@
+'''
+Long running packing service for pack-station clients
+	- a warm pool of packing processes, each loading the model & torch once at startup; GET /health answers ready once all have
+	- POST /pack with a single order {"order_id":..., "items":[{"item_id":..., "qty":...}, ...]} or a batch {"orders":[order, ...]}
+	  items not in the item master give their own "length", "width", "height" (inches) & "weight" (LBs)
+	  an order's optional "budget_s" caps its packing time, see pack_scheduler.py
+	  with "provisional": true the response streams JSON lines as results come: {"status": "provisional", ...} with the heuristic
+	  packing of each order RL packing goes on to improve, then {"status": "final", ...} for every order
+	- returns per order the fields predict.py writes to the results file
+'''
+import argparse, math, asyncio, threading, queue, json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from flask import Flask, Response, request, jsonify
+
+import multiprocessing as mp
+
+import config
+import order_reader
+import predict
+from packing_cache import PackingCache
+from pack_scheduler import PackScheduler
+
+
+ITEM_FIELDS = ["length", "width", "height", "weight"] # same order as order_reader.ITEM_COLS
+
+
+def warm_up(frozen_model, barrier):
+	'''
+	model of this packing process loaded, the barrier keeps the process from taking another warm-up task so each takes one
+	'''
+	try:
+		predict.worker_model(frozen_model)
+	finally:
+		barrier.wait()
+
+
+class PackingService():
+	def __init__(self, n_workers=config.N_PARALLEL_JOBS, frozen_model=False):
+		item_master_df = order_reader.read_table(config.ITEM_MASTER_FILE)
+		self.item_master = dict(zip(item_master_df["ITEM_ID"].astype(str), item_master_df[order_reader.ITEM_COLS].to_numpy(dtype=np.float64)))
+
+		packing_cache = PackingCache(config.PACKING_CACHE_FILE, config.PACKING_CACHE_MAX_ORDERS) if config.USE_PACKING_CACHE else None
+
+		self.pool = ProcessPoolExecutor(n_workers) # spawn start method set by __main__, mp_context is python 3.7+
+		self.scheduler = PackScheduler(self.pool, frozen_model, packing_cache)
+
+		self.ready = threading.Event() # set once every packing process has loaded the model, see health()
+		self.warm_up_error = None
+		threading.Thread(target=self.warm_up, args=(n_workers, frozen_model), daemon=True).start()
+
+	def warm_up(self, n_workers, frozen_model):
+		'''
+		load the model in every packing process before orders come, instead of on the first RL order of each (initializer= is python 3.7+)
+		'''
+		manager = mp.Manager()
+		try:
+			barrier = manager.Barrier(n_workers)
+			for future in [self.pool.submit(warm_up, frozen_model, barrier) for i in range(n_workers)]:
+				future.result()
+			self.ready.set()
+		except Exception as e: # eg missing checkpoint or torch install
+			self.warm_up_error = e
+			print("packing processes failed to load the model:", e)
+		finally:
+			manager.shutdown()
+
+	def health(self):
+		'''
+		(status, http code): ok once warmed up
+		'''
+		if self.warm_up_error is not None:
+			return "model failed to load: {}".format(self.warm_up_error), 500
+		if not self.ready.is_set():
+			return "warming up", 503
+		return "ok", 200
+
+	def close(self):
+		self.pool.shutdown()
+
+	def order_payload(self, proc_id, order):
+		'''
+		order as sent by a client => (proc_id, order_id, item_ids, order_qtys, item_dims) for predict.pack_orders
+		'''
+		item_ids, order_qtys, item_dims = [], [], []
+		for item in order["items"]:
+			if all(field in item for field in ITEM_FIELDS):
+				dims = [float(item[field]) for field in ITEM_FIELDS]
+			elif str(item["item_id"]) in self.item_master:
+				dims = self.item_master[str(item["item_id"])]
+			else:
+				raise ValueError("item {} not in item master & no dimensions given".format(item["item_id"]))
+
+			item_ids.append(item["item_id"])
+			order_qtys.append(int(item.get("qty", 1)))
+			item_dims.append(dims)
+
+		return (proc_id, str(order["order_id"]), np.array(item_ids), np.array(order_qtys), np.array(item_dims, dtype=np.float64).reshape(-1, 4))
+
+	def parse(self, orders):
+		'''
+		(payloads, budgets) of the orders sent by a client, KeyError/TypeError/ValueError for a bad order
+		'''
+		payloads = [self.order_payload(i, order) for i, order in enumerate(orders)]
+		budgets = [None if order.get("budget_s") is None else float(order["budget_s"]) for order in orders]
+		return payloads, budgets
+
+	@staticmethod
+	def result_dict(payload, result):
+		return {"order_id":payload[1], "time_taken":None if math.isnan(result[1]) else result[1], "num_containers":result[2],
+				"used_containers":str(result[3]), "Container-wise packing-info":result[4]}
+
+	def run_scheduler(self, payloads, budgets, **kwargs):
+		# one order per task, so a big order doesn't hold up the small ones of a batch
+		# a loop per request as flask serves each in its own thread, asyncio.run is python 3.7+
+		loop = asyncio.new_event_loop()
+		try:
+			return loop.run_until_complete(self.scheduler.pack_all(payloads, budgets, **kwargs))
+		finally:
+			loop.close()
+
+	def pack(self, payloads, budgets):
+		'''
+		[{"order_id", "time_taken", "num_containers", "used_containers", "Container-wise packing-info"}, ...] for parsed orders
+		'''
+		results = self.run_scheduler(payloads, budgets)
+		return [self.result_dict(payload, result) for payload, result in zip(payloads, results)]
+
+	def pack_stream(self, payloads, budgets):
+		'''
+		("provisional" | "final", result dict as from pack) of parsed orders as they come: the heuristic packing of each order
+		RL packing goes on to improve, then the final packing of every order; raises what packing raised
+		'''
+		events = queue.Queue()
+		def run():
+			try:
+				self.run_scheduler(payloads, budgets, on_provisional=lambda result: events.put(("provisional", result)),
+								   on_final=lambda result: events.put(("final", result)))
+				events.put(None)
+			except Exception as e:
+				events.put(e)
+		threading.Thread(target=run, daemon=True).start()
+
+		while True:
+			event = events.get()
+			if event is None:
+				return
+			if isinstance(event, Exception):
+				raise event
+			status, result = event
+			yield status, self.result_dict(payloads[result[0]], result)
+
+
+def create_app(service):
+	app = Flask(__name__)
+
+	@app.route("/health", methods=["GET"])
+	def health():
+		status, code = service.health()
+		return jsonify({"status":status}), code
+
+	@app.route("/pack", methods=["POST"])
+	def pack():
+		body = request.get_json(force=True)
+		try:
+			orders = body["orders"] if "orders" in body else [body]
+			payloads, budgets = service.parse(orders)
+		except (KeyError, TypeError, ValueError, AttributeError) as e:
+			return jsonify({"error":"bad order: {}".format(e)}), 400
+
+		if body.get("provisional"):
+			def stream():
+				try:
+					for status, result in service.pack_stream(payloads, budgets):
+						yield json.dumps(dict(result, status=status)) + "\n"
+				except Exception as e: # status line already sent
+					yield json.dumps({"error":"packing failed: {}".format(e)}) + "\n"
+			return Response(stream(), mimetype="application/x-ndjson")
+
+		try:
+			results = service.pack(payloads, budgets)
+		except Exception as e:
+			return jsonify({"error":"packing failed: {}".format(e)}), 500
+
+		return jsonify({"orders":results} if "orders" in body else results[0])
+
+	return app
+
+
+if __name__=="__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--host', default=config.SERVICE_HOST)
+	parser.add_argument('--port', type=int, default=config.SERVICE_PORT)
+	parser.add_argument('--workers', type=int, default=config.N_PARALLEL_JOBS, help='packing processes kept warm')
+	parser.add_argument('--frozen_model', action='store_true', help='use the TorchScript export from export_model.py instead of the training checkpoint')
+
+	args = parser.parse_args()
+
+	mp.set_start_method("spawn", force=True)
+	service = PackingService(args.workers, args.frozen_model)
+	print("packing service with {} warm workers on {}:{}".format(args.workers, args.host, args.port))
+	try:
+		create_app(service).run(host=args.host, port=args.port, threaded=True)
+	finally:
+		service.close()
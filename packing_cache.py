@@ -0,0 +1,139 @@
+'''
+On-disk cache of packing results per order, keyed by the order's multiset of item sizes & weights
+	- repeat orders (same items & quantities, any item names/order) reuse the stored containers & item placements
+	- stored in SQLite, shared by all packing processes; least recently used orders get evicted beyond max_orders
+	- a cache that fails (eg database locked by the other packing processes) counts as a miss & never fails the order
+'''
+import os, json, time, hashlib, sqlite3
+from collections import defaultdict
+
+import config
+
+
+def model_version():
+	'''
+	size & modification time of the RL model files (checkpoint & frozen export), None for a missing one
+	'''
+	files = []
+	for filename in (config.save_model_name, config.frozen_model_name):
+		path = os.path.join(config.epoch_dir, filename)
+		files.append([filename, os.path.getsize(path), os.path.getmtime(path)] if os.path.exists(path) else [filename, None])
+	return files
+
+
+def catalogue_version():
+	'''
+	changes whenever containers, settings or the RL model that change packing results do, so older results don't get reused
+	'''
+	settings = [config.CONTAINERS_CONFIG, config.min_supported_corners, config.rl_threshold_num_containers,
+				config.rl_max_items, config.rl_max_items_budgeted, config.rl_time_budget,
+				config.simulation_times, config.search_depth, config.leaf_batch_size, config.compact_obs,
+				sorted((name, value) for name, value in vars(config).items() if name.startswith("mcts_")),
+				config.single_sku_heuristic, config.heuristic_corner_priority, config.heuristic_drop_covered_corners, config.PACKING_CACHE_VERSION, model_version()]
+	return hashlib.sha1(repr(settings).encode()).hexdigest()
+
+
+def item_key(item):
+	# item: [l, w, h, dx, dy, dz, box_wt, item_name, orderID, box_lwh] from predict.py; dx,dy,dz follow from l,w,h
+	return (float(item[0]), float(item[1]), float(item[2]), float(item[6]))
+
+
+class PackingCache():
+	def __init__(self, path, max_orders=100000):
+		self.path = path
+		self.max_orders = max_orders
+		self.version = catalogue_version()
+		self.conn = None # opened on first use in each process
+		self.num_puts = 0
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["conn"] = None # sqlite connections can't be shared across processes
+		return state
+
+	def _connect(self):
+		if self.conn is None:
+			conn = sqlite3.connect(self.path, timeout=60)
+			conn.execute("PRAGMA journal_mode=WAL") # readers don't block the writing process
+			conn.execute("PRAGMA synchronous=NORMAL") # no fsync per commit, a crash can only lose recent results
+			conn.execute("CREATE TABLE IF NOT EXISTS orders (key TEXT PRIMARY KEY, result TEXT, last_used REAL)")
+			conn.commit()
+			self.conn = conn # only once set up, so a failed attempt gets retried
+		return self.conn
+
+	def _failed(self, e):
+		print("packing cache {} unavailable: {}".format(self.path, e))
+		if self.conn is not None:
+			try:
+				self.conn.rollback()
+			except sqlite3.Error:
+				self.conn = None
+
+	def order_key(self, boxes, num_rows):
+		'''
+		fingerprint of the sorted (l, w, h, wt) multiset of items (boxes: BoxArray of the order), the order's number of rows
+		(predict.py decides on RL packing & sorts items by it) & the catalogue version
+		'''
+		return hashlib.sha1(json.dumps([self.version, int(num_rows), boxes.multiset()]).encode()).hexdigest()
+
+	def get(self, items_info, boxes, num_rows):
+		'''
+		cached [num_containers, str(used_container_names), container-wise packing-info] for the order with its own item names, else None
+		'''
+		key = self.order_key(boxes, num_rows)
+		try:
+			conn = self._connect()
+			row = conn.execute("SELECT result FROM orders WHERE key=?", (key,)).fetchone()
+			if row is None:
+				return None
+
+			conn.execute("UPDATE orders SET last_used=? WHERE key=?", (time.time(), key))
+			conn.commit()
+		except sqlite3.Error as e:
+			self._failed(e)
+			return None
+
+		result = json.loads(row[0])
+		if "message" in result:
+			return [0, "[]", result["message"]]
+
+		# any item of the same size & weight can take a placement
+		item_names = defaultdict(list)
+		for item in items_info:
+			item_names[item_key(item)].append(item[7])
+		item_names = {k:iter(v) for k, v in item_names.items()}
+
+		container_wise_packing = ""
+		for container_name, placements in result["containers"]:
+			container_wise_packing += container_name + "<= #items:{} details =>".format(len(placements)) \
+									+ str([next(item_names[tuple(k)]) + placement for k, placement in placements]) + "\n"
+
+		container_wise_packing = container_wise_packing[:-1] # remove last newline
+		used_container_names = [container_name for container_name, _ in result["containers"]]
+		return [len(used_container_names), str(used_container_names), container_wise_packing]
+
+	def put(self, items_info, boxes, num_rows, packing_info=None, message=None):
+		'''
+		boxes, num_rows: BoxArray & number of rows of the order, see order_key
+		packing_info: {container name: {"packed_boxes":[Box, ...], ...}} as reported for the order
+		message     : instead, the reason the order couldn't be packed
+		'''
+		if message is not None:
+			result = {"message":message}
+		else:
+			names_key = {item[7]:item_key(item) for item in items_info}
+			result = {"containers":[[container_name, [[names_key[b.name], b.basic_info()[len(b.name):]] for b in packing["packed_boxes"]]]
+										for container_name, packing in packing_info.items()]}
+
+		try:
+			conn = self._connect()
+			conn.execute("INSERT OR REPLACE INTO orders VALUES (?, ?, ?)", (self.order_key(boxes, num_rows), json.dumps(result), time.time()))
+
+			self.num_puts += 1
+			if self.num_puts % 100 == 0: # evict in batches, counting rows every time costs more than an insert
+				num_orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+				if num_orders > self.max_orders:
+					conn.execute("DELETE FROM orders WHERE key IN (SELECT key FROM orders ORDER BY last_used LIMIT ?)", (num_orders - self.max_orders,))
+			conn.commit()
+		except sqlite3.Error as e:
+			self._failed(e)
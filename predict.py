@@ -1,37 +1,70 @@
-import os, sys, math, random, time, copy, argparse
+import os, sys, math, random, time, copy, argparse, itertools, contextlib, functools
+import concurrent.futures
+import multiprocessing as mp
 
 import numpy as np
 from collections import deque
-from joblib import Parallel, delayed, parallel_backend
-
-import pandas as pd
-
-import torch
-from torch.multiprocessing import Process, Pipe
-import torch.multiprocessing as mp
 
 import config
 
-from model_arch.model import NNetWrapper
-from model_arch.net import CNNPro
-from mcts.monteCarlo import MCTree
-
-from pack_env.box import Box
+from pack_env.box import Box, BoxArray
 from pack_env.packingEnv import PackEnv
 from pack_env.packingHeuristic import PackHeuristic
 
-from pack_env.plot import Map
-
+from packing_cache import PackingCache
 
-def pack_customer_order(proc_id, cust_order_df, model, all_customer_order_ids, plot_packing=False, plot_file=None, check_print=False):
+# packing processes import this module too, so heavy modules are imported where needed instead:
+# torch (model_arch, mcts.parallel) when RL packing triggers, matplotlib (pack_env.plot) when plotting, pandas (order_reader) in the parent
 
-	start = time.time()
 
+def pack_customer_order(proc_id, cust_order_df, model, all_customer_order_ids, plot_packing=False, plot_file=None, check_print=False, packing_cache=None):
 	order_id = all_customer_order_ids[proc_id]
-	cust_order_df = cust_order_df[cust_order_df["ORDER_ID"] == order_id]
-	cust_order_df.reset_index(drop=True, inplace=True)
+	return pack_order(proc_id, order_id, cust_order_df[cust_order_df["ORDER_ID"] == order_id], model, plot_packing, plot_file, check_print, packing_cache)
+
+
+def pack_order(proc_id, order_id, cust_order_df, model, plot_packing=False, plot_file=None, check_print=False, packing_cache=None):
+	'''
+	cust_order_df: rows of the one order, joined with the item master, see order_reader.iter_orders
+	'''
+	import order_reader
+	return pack_order_items(proc_id, order_id, *order_reader.order_arrays(cust_order_df), model, plot_packing, plot_file, check_print, packing_cache)
+
+
+def use_rl_packing(num_unique_items, num_items, num_containers, budgeted=False):
+	# RL based packing.
+	# for faster results avoid when:
+	# (a) heuristic already gave best case solution eg 1 container 
+	# (b) if there is just a single item type in a customer order, heuristics will suffice
+	# (c) if too many items to pack, since RL can take ~0.25-1s/item and that much time is not available on client side eg for 10 items it can take upto 10s
+	#     with a time budget (budgeted) the search gets cut to fit, so larger orders can use RL too
+	max_items = config.rl_max_items_budgeted if budgeted else config.rl_max_items
+	return (num_unique_items > 1) and (num_items <= max_items) and (num_containers > config.rl_threshold_num_containers)
+
+
+def replay_packing(box_list, container_ids, actions, order_boxes=None):
+	'''
+	PackEnv with actions (eg MCTree.best_packing) taken
+	'''
+	packEnv = PackEnv(datagen_mode="predict", customer_order_list=box_list, init_container_ids_list=container_ids, order_boxes=order_boxes)
+	packEnv.reset(check_print=False, mode_mcts_sim=False)
+	for actionID in actions:
+		packEnv.step(actionID, check_print=False, mode_mcts_sim=False)
+	return packEnv
+
+
+def pack_order_items(proc_id, order_id, item_ids, order_qtys, item_dims, model, plot_packing=False, plot_file=None, check_print=False, packing_cache=None, use_rl=True, deadline=None, frozen_model=False,
+					 keep_heuristic=False, heuristic=None):
+	'''
+	item_ids, order_qtys, item_dims: per row of the order, see order_reader.order_arrays
+	model   : None for this process's worker_model(frozen_model), loaded only if RL packing triggers
+	use_rl  : False for the heuristic packing only eg as provisional result, see pack_scheduler.py
+	deadline: time.time() by which RL packing has to finish, else the heuristic packing is kept
+	keep_heuristic: append the heuristic packing to the result if RL packing could improve on it (else None), for heuristic
+	heuristic     : that heuristic packing of an earlier run for the same order, so it isn't packed again
+	'''
+	start = time.time()
 
-	num_items = cust_order_df["ORDER_QTY"].sum()
+	num_items = order_qtys.sum()
 	orderID = "ORDER_ID_" + str(order_id)
 	
 	#######################################################
@@ -39,14 +72,11 @@ def pack_customer_order(proc_id, cust_order_df, model, all_customer_order_ids, p
 	items_info = []
 
 	item_num = 1
-	for i in range(len(cust_order_df)):
-		item_id = cust_order_df.loc[i, "ITEM_ID"]
+	for i in range(len(item_ids)):
+		item_id = item_ids[i]
 		# in case multiple orders for same item
-		for j in range(int(cust_order_df.loc[i, "ORDER_QTY"])):
-			box_len = cust_order_df.loc[i, "UNIT_LENGTH (Inches)"]
-			box_wid = cust_order_df.loc[i, "UNIT_WIDTH (Inches)"]
-			box_ht = cust_order_df.loc[i, "UNIT_HEIGHT (Inches)"]
-			box_wt = cust_order_df.loc[i, "UNIT_WEIGHT (LBs)"]
+		for j in range(int(order_qtys[i])):
+			box_len, box_wid, box_ht, box_wt = item_dims[i]
 			
 			box_lwh = [box_len, box_wid, box_ht]
 			box_dims = copy.deepcopy(box_lwh)
@@ -67,7 +97,7 @@ def pack_customer_order(proc_id, cust_order_df, model, all_customer_order_ids, p
 			items_info.append([l, w, h, dx, dy, dz, box_wt, item_name, orderID, box_lwh])
 
 	# sort all items by their X-value..only needed if unique items > 1
-	if len(cust_order_df) > 1:
+	if len(item_ids) > 1:
 		items_info.sort(key=lambda x: x[0])
 		items_info = items_info[::-1]
 
@@ -86,55 +116,101 @@ def pack_customer_order(proc_id, cust_order_df, model, all_customer_order_ids, p
 	if len(items_info) > 700:
 		return [proc_id, time.time() - start, 0, "[]", "Currently packing only <=700 items in one order"]
 
+	order_boxes = BoxArray.from_order(order_qtys, item_dims) # for the order's totals & cache key
+
+	# same items packed before
+	if packing_cache is not None and not plot_packing and heuristic is None:
+		cached_result = packing_cache.get(items_info, order_boxes, len(item_ids))
+		if cached_result is not None:
+			return [proc_id, time.time() - start] + cached_result + ([None] if keep_heuristic else [])
 
 	######################################################
 	############### Packing #############################
 	try:
-		# check heuristic - generally much faster eg .001-.05s/item in many trivial cases
-		px = PackHeuristic(items_info, input_box_list_orig)
-		packed, used_container_ids, used_container_names, packing_info, container_wise_packing = px.check_packing()
-		time_taken = time.time() - start
+		if heuristic is None:
+			# check heuristic - generally much faster eg .001-.05s/item in many trivial cases
+			px = PackHeuristic(items_info, input_box_list_orig)
+			packed, used_container_ids, used_container_names, packing_info, container_wise_packing = px.check_packing()
+			time_taken = time.time() - start
+		else:
+			time_taken, used_container_ids, used_container_names, packing_info, container_wise_packing = heuristic
 
 		if packing_info == "can't be packed":
 			# in case some LWH or wt violation for any item of the customer order
-			return [proc_id, time_taken, 0, "[]", "Can't be packed - some item dim/wt violation"]
+			if packing_cache is not None:
+				packing_cache.put(items_info, order_boxes, len(item_ids), message="Can't be packed - some item dim/wt violation")
+			return [proc_id, time_taken, 0, "[]", "Can't be packed - some item dim/wt violation"] + ([None] if keep_heuristic else [])
 
+		budgeted = config.rl_time_budget is not None or deadline is not None
+		rl_eligible = use_rl_packing(len(item_ids), len(items_info), len(used_container_ids), budgeted)
+		heuristic = (time_taken, used_container_ids, used_container_names, packing_info, container_wise_packing) if rl_eligible else None
 
 		ib = input_box_list_orig
 		pck = packing_info
 		pltf = plot_file
 
-		# RL based packing.
-		# for faster results avoid when:
-		# (a) heuristic already gave best case solution eg 1 container 
-		# (b) if there is just a single item type in a customer order, heuristics will suffice
-		# (c) if too many items to pack, since RL can take ~0.25-1s/item and that much time is not available on client side eg for 10 items it can take upto 10s
+		if use_rl and rl_eligible and model is None:
+			model = worker_model(frozen_model) # not in the try below, a model that doesn't load is an error, not a heuristic packing
+
+		rl_timed_out = False
+		rl_done = False # RL packing searched all items
 		try:
 			start = time.time()
-			if (len(cust_order_df) > 1) and (len(items_info) <= 20) and (len(used_container_ids) > config.rl_threshold_num_containers):
+			if use_rl and rl_eligible:
+				from mcts.monteCarlo import MCTree, SearchBudget
+
 				unique_container_ids = list(sorted(set(used_container_ids), key=used_container_ids.index))
 
 				# print("using RL packing")
-				packEnv = PackEnv(datagen_mode="predict", customer_order_list=input_box_list_int, init_container_ids_list=unique_container_ids)
+				int_boxes = order_boxes.integerized()
+				packEnv = PackEnv(datagen_mode="predict", customer_order_list=input_box_list_int, init_container_ids_list=unique_container_ids, order_boxes=int_boxes)
 				
 				actionId_lookUp = packEnv.actionId_lookUp
 				box_list = packEnv.boxSeqGenerator.box_list
 				item_names = [b.name for b in packEnv.boxSeqGenerator.box_list]
 
 				packEnv.reset(check_print=False, mode_mcts_sim=False)
-				mctree = MCTree(model, packEnv, config.search_depth)
-
-				for i in range(packEnv.boxSeqGenerator.num_boxes):
-					# print("packing {}/{} name:{}".format(i, packEnv.boxSeqGenerator.num_boxes, packEnv.boxSeqGenerator.box_list[i].name))
-
-					actionID = mctree.select_action(config.simulation_times, check_print=False)
-					reward, done, info = packEnv.step(actionID, check_print=False, mode_mcts_sim=False)
-					mctree.succeed(actionID)
-
-
+				if root_workers() > 1:
+					mctree = root_search(model)
+					mctree.reset(packEnv, config.search_depth)
+				else:
+					mctree = MCTree(model, packEnv, config.search_depth)
+
+				budget = None
+				if budgeted:
+					seconds = min(np.inf if config.rl_time_budget is None else config.rl_time_budget, np.inf if deadline is None else deadline - time.time())
+					budget = SearchBudget(seconds, packEnv.boxSeqGenerator.num_boxes)
+
+				try:
+					for i in range(packEnv.boxSeqGenerator.num_boxes):
+						if deadline is not None and time.time() > deadline:
+							rl_timed_out = True
+							break
+
+						# print("packing {}/{} name:{}".format(i, packEnv.boxSeqGenerator.num_boxes, packEnv.boxSeqGenerator.box_list[i].name))
+
+						time_budget = None if budget is None else budget.item_seconds(int(packEnv.current_box_mask.sum()))
+						if time_budget is not None and deadline is not None:
+							time_budget = min(time_budget, deadline - time.time()) # the deadline is a hard cutoff, not a share
+						actionID = mctree.select_action(config.simulation_times, check_print=False, time_budget=time_budget)
+						reward, done, info = packEnv.step(actionID, check_print=False, mode_mcts_sim=False)
+						mctree.succeed(actionID)
+
+					best_packing = mctree.best_packing
+				except BaseException:
+					if mctree is _root_search: # workers may be mid-search, so they're started afresh for the next order
+						close_root_search()
+					raise
+
+				# a simulation may have come across a better complete packing, the only one if out of time
+				if best_packing is not None and (rl_timed_out or best_packing[0] < len(packEnv.container_sets_status.container_placedBox_lookUp)):
+					packEnv = replay_packing(input_box_list_int, unique_container_ids, best_packing[1], int_boxes)
+					rl_timed_out = False
+
+				rl_done = not rl_timed_out
 				num_containers_new = len(packEnv.container_sets_status.container_placedBox_lookUp)
 
-				if num_containers_new < len(used_container_ids):
+				if not rl_timed_out and num_containers_new < len(used_container_ids):
 
 					packing_info = packEnv.container_sets_status.container_placedBox_lookUp
 
@@ -160,29 +236,131 @@ def pack_customer_order(proc_id, cust_order_df, model, all_customer_order_ids, p
 
 					ib = input_box_list_int
 					pck = new_packing_info
-					pltf = plot_file[:-4] + "_RL_.gif"
+					pltf = plot_file[:-4] + "_RL_.gif" if plot_file else None
 		except:
 			pass
 
-		if plot_packing:
+		# heuristic packings that RL could improve on aren't final, nor are RL packings cut short by a time budget or deadline
+		if packing_cache is not None and (not rl_eligible or (rl_done and not budgeted)):
+			packing_cache.put(items_info, order_boxes, len(item_ids), pck)
+
+		if plot_packing and (rl_done or heuristic is None or not keep_heuristic): # final packing only
+			from pack_env.plot import Map
 			x = Map(ib, pck, pltf)
 
-		return [proc_id, time_taken, len(used_container_names), str(used_container_names), container_wise_packing]
+		result = [proc_id, time_taken, len(used_container_names), str(used_container_names), container_wise_packing]
+		return (result + [None if rl_done else heuristic]) if keep_heuristic else result
 		
 	except Exception as e:
 		print(e)
-		return [proc_id, np.nan, 0, "[]", "Some unexpected error"]
+		return [proc_id, np.nan, 0, "[]", "Some unexpected error"] + ([None] if keep_heuristic else [])
 
 
+_worker_model = None # model of this packing process, see worker_model
+
+def load_model(frozen_model=False):
+	from model_arch.model import NNetWrapper
+	from model_arch.net import CNNPro
+	if frozen_model:
+		model = NNetWrapper(None)
+		model.load_frozen(folder=config.epoch_dir, filename=config.frozen_model_name, num_threads=config.N_TORCH_THREADS)
+	else:
+		net = CNNPro()
+		model = NNetWrapper(net)
+		model.load_checkpoint(folder=config.epoch_dir, filename=config.save_model_name)
+		model.prepare_inference(device="cpu", num_threads=config.N_TORCH_THREADS) # cpu for multi-processing
+	return model
+
+
+def worker_model(frozen_model=False):
+	'''
+	loaded once by each packing process on its first RL packing, instead of being pickled into every task
+	a load that failed raises again for every order after, instead of being retried
+	'''
+	global _worker_model
+	if _worker_model is None:
+		try:
+			_worker_model = load_model(frozen_model)
+		except Exception as e:
+			_worker_model = e
+	if isinstance(_worker_model, Exception):
+		raise _worker_model
+	return _worker_model
+
+
+_root_search = None # RootParallelMCTS of this process, see root_search
+
+def root_workers():
+	'''
+	processes searching the trees of an order, packing processes of a pool search a single tree as the pool keeps the cores busy
+	at most one per 2 of an item's simulation_times, a worker's first simulation only expands its root
+	'''
+	if mp.current_process().name != "MainProcess": # a pool's packing process, mp.parent_process() is python 3.8+
+		return 1
+	return max(1, min(config.mcts_root_workers, config.simulation_times // 2))
+
+
+def root_search(model):
+	'''
+	RootParallelMCTS started on the first RL packing of this process, for all the orders it packs after
+	'''
+	global _root_search
+	if _root_search is None:
+		from mcts.parallel import RootParallelMCTS
+		_root_search = RootParallelMCTS(model, root_workers())
+	return _root_search
+
+
+def close_root_search():
+	global _root_search
+	if _root_search is not None:
+		_root_search.close()
+		_root_search = None
+
+
+def pack_orders(orders, frozen_model=False, plot_packing=False, plot_file=None, packing_cache=None, use_rl=True, deadline=None, **kwargs):
+	'''
+	orders: [(proc_id, order_id, item_ids, order_qtys, item_dims), ...] packed as one task of a packing process
+	kwargs: further pack_order_items arguments eg keep_heuristic
+	'''
+	return [pack_order_items(*order, None, plot_packing, plot_file, packing_cache=packing_cache, use_rl=use_rl, deadline=deadline, frozen_model=frozen_model, **kwargs)
+			for order in orders]
+
+
+def completed(executor, tasks, in_flight):
+	'''
+	results of tasks (callables) run by executor, as they complete
+	at most in_flight of them submitted at a time, so tasks (eg orders of a file being read) are taken only as far as the packing processes got
+	'''
+	tasks = iter(tasks)
+	pending = set()
+	while True:
+		for task in itertools.islice(tasks, in_flight - len(pending)):
+			pending.add(executor.submit(task))
+		if len(pending) == 0:
+			return
+		done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+		for future in done:
+			yield future.result()
+
 
 if __name__=="__main__":
 
-	torch.multiprocessing.set_start_method('spawn')
+	import pandas as pd
+	from concurrent.futures import ProcessPoolExecutor
+	import order_reader
+	import result_writer
+
+	mp.set_start_method('spawn', force=True) # for the packing processes too, ProcessPoolExecutor's mp_context is python 3.7+
 
 	parser = argparse.ArgumentParser()
 	parser.add_argument('--mode', default='demo', help='demo | live; files in ./demo/ or ./live_predictions/; ')	
 	parser.add_argument('--inputfile', default='single_customer_order_10_different_items.xlsx', help='customer order file, should be inside ./demo/input_files/ or ./live_predictions/input_files/ as from mode')
-	parser.add_argument('--plot_packing', default=True, help='plot container-wise packing')
+	parser.add_argument('--plot_packing', default=True, type=lambda v: str(v).lower() not in ("false", "0", "no"), help='plot container-wise packing (single order files only)')
+	parser.add_argument('--sorted_input', action='store_true', help='rows of each order are contiguous in the input file, so orders get packed while the file is still being read')
+	parser.add_argument('--frozen_model', action='store_true', help='use the TorchScript export from export_model.py instead of the training checkpoint')
+	parser.add_argument('--results_format', default=config.RESULTS_FORMAT, help='xlsx | csv | parquet; csv or parquet for large order files')
+	parser.add_argument('--stream_results', action='store_true', help='write results every config.RESULTS_CHUNK_ORDERS orders as they complete, rows grouped by order')
 
 	args = parser.parse_args()
 	customer_order_file = args.inputfile
@@ -192,49 +370,101 @@ if __name__=="__main__":
 	else:
 		inputdir = "./demo"
 
-	save_results_file_name = inputdir + "/pack_results/" + customer_order_file.split(".")[0] + "_packing.xlsx"
+	save_results_file_name = inputdir + "/pack_results/" + customer_order_file.split(".")[0] + "_packing." + args.results_format
 	save_plot_gif_file = inputdir + "/pack_results/" + customer_order_file.split(".")[0] + "_plot.gif"        
 
-	cust_order_df = pd.read_excel(inputdir + "/input_files/" + customer_order_file, header=0)
-	item_master_df = pd.read_excel(config.ITEM_MASTER_FILE, header=0)
+	item_master_df = order_reader.read_table(config.ITEM_MASTER_FILE)
+	orders = order_reader.iter_orders(inputdir + "/input_files/" + customer_order_file, item_master_df, sorted_input=args.sorted_input)
 
-	cust_order_df = cust_order_df.merge(item_master_df, on=["ITEM_ID"], how="left")
+	# plot only a single order, so look ahead whether there's a second one
+	first_orders = list(itertools.islice(orders, 2))
+	orders = itertools.chain(first_orders, orders)
 
-	cust_order_df["ORDER_ID"] = cust_order_df["ORDER_ID"].astype(str)
-	unique_cust_order_ids = cust_order_df["ORDER_ID"].unique().tolist()
-
-	print("# customer orders", len(unique_cust_order_ids), unique_cust_order_ids[:3], unique_cust_order_ids[-3:])
-
-	if args.plot_packing and len(unique_cust_order_ids) == 1:
+	if args.plot_packing and len(first_orders) == 1:
 		args.plot_packing = True
 	else:
 		args.plot_packing = False
 
-	start = time.time()
-	net = CNNPro()
-	net.to(torch.device("cpu")) # for multi-processing
-	model = NNetWrapper(net)
-	model.load_checkpoint(folder=config.epoch_dir, filename=config.save_model_name)
-
+	packing_cache = PackingCache(config.PACKING_CACHE_FILE, config.PACKING_CACHE_MAX_ORDERS) if config.USE_PACKING_CACHE else None
 
 	print("generating predictions")
+	proc_ids = itertools.count()
+	order_rows = {} # proc_id: input rows of the order for the results file, until written
+	payloads = {} # proc_id: order as plain arrays, until packed for good
+	def packing_tasks():
+		# ORDERS_PER_TASK orders as plain arrays per task, model gets loaded by the packing processes themselves
+		# heuristic packing only, orders RL packing could improve on get deferred to rl_tasks
+		for task_orders in iter(lambda: list(itertools.islice(orders, config.ORDERS_PER_TASK)), []):
+			task_payloads = []
+			for order_id, order_df in task_orders:
+				proc_id = next(proc_ids)
+				payloads[proc_id] = (proc_id, order_id) + order_reader.order_arrays(order_df)
+				order_rows[proc_id] = order_df.drop(columns=order_reader.ITEM_COLS)
+				task_payloads.append(payloads[proc_id])
+			yield functools.partial(pack_orders, task_payloads, args.frozen_model, args.plot_packing, save_plot_gif_file, packing_cache, use_rl=False, keep_heuristic=True)
+
+	deferred = [] # (order, its heuristic packing) of the orders RL packing could improve on
+	def packed(results):
+		# results of the orders packed for good, the others get deferred
+		final = []
+		for result in results:
+			order = payloads.pop(result[0])
+			if result[-1] is None:
+				final.append(result[:-1])
+			else:
+				deferred.append((order, result[-1]))
+		return final
+
+	def rl_tasks():
+		# most items first, so the orders searching longest don't start last & hold up the batch
+		deferred.sort(key=lambda d: -d[0][3].sum())
+		while len(deferred) > 0:
+			order, heuristic = deferred.pop(0)
+			yield functools.partial(pack_orders, [order], args.frozen_model, args.plot_packing, save_plot_gif_file, packing_cache, heuristic=heuristic)
+
+	writer = result_writer.ResultWriter(save_results_file_name)
+	num_written = 0 # orders whose results are written
+	def write_results(results):
+		global num_written
+		results.sort(key=lambda x:x[0])
+		writer.write(result_writer.results_frame([order_rows.pop(result[0]) for result in results], results)) # written, no need to keep
+		num_written += len(results)
+
+	def pack_here(tasks):
+		return (task() for task in tasks)
+
+	results = [] # packed for good, not written yet
+	def add_results(task_results):
+		global results
+		results += task_results
+		if args.stream_results and len(results) >= config.RESULTS_CHUNK_ORDERS:
+			write_results(results)
+			results = []
+
 	start = time.time()
-	with parallel_backend('multiprocessing', n_jobs=config.N_PARALLEL_JOBS):
-		list_results = Parallel()(delayed(pack_customer_order)(i, cust_order_df, model, unique_cust_order_ids, args.plot_packing, save_plot_gif_file) for i in range(len(unique_cust_order_ids)))
+	with contextlib.ExitStack() as stack:
+		if len(first_orders) == 1:
+			# single order packed right here, leaving the cores to its search (see root_workers)
+			pack = pack_here
+		else:
+			executor = stack.enter_context(ProcessPoolExecutor(config.N_PARALLEL_JOBS))
+			pack = lambda tasks: completed(executor, tasks, config.ORDER_PRE_DISPATCH * config.N_PARALLEL_JOBS)
+
+		for task_results in pack(packing_tasks()):
+			add_results(packed(task_results))
+
+		if len(deferred) > 0:
+			# loaded here before any RL packing, so a missing checkpoint or torch install stops the run instead of each order keeping its heuristic packing
+			worker_model(args.frozen_model)
+
+		# fewer orders left to search than packing processes would leave cores idle, so each gets all of them instead
+		if len(deferred) < config.N_PARALLEL_JOBS and root_workers() > 1:
+			pack = pack_here
+		for task_results in pack(rl_tasks()):
+			add_results(task_results)
+		if len(results) > 0:
+			write_results(results)
+	close_root_search()
+	writer.close()
 	print("finished all packing in", time.time() - start)
-	list_results.sort(key=lambda x:x[0])
-
-	for i in range(len(unique_cust_order_ids)):
-		first_row = cust_order_df.index[cust_order_df["ORDER_ID"] == unique_cust_order_ids[i]][0]
-		cust_order_df.loc[first_row, "time_taken"] = list_results[i][1]
-		cust_order_df.loc[first_row, "num_containers"] = list_results[i][2]
-		cust_order_df.loc[first_row, "used_containers"] = str(list_results[i][3])
-		cust_order_df.loc[first_row, "Container-wise packing-info"] = list_results[i][4]
-		
-	extra_cols = ["ITEM_NAME","DESCRIPTION", "UNIT_HEIGHT (Inches)", "UNIT_LENGTH (Inches)", "UNIT_WIDTH (Inches)", "UNIT_WEIGHT (LBs)", "UNIT_VOLUME (Cubic Feet)"]
-	cust_order_df.drop(columns=extra_cols, inplace=True)
-
-	cust_order_df.to_excel(save_results_file_name, index=False)
-
-
-
+	print("# customer orders", num_written)
@@ -0,0 +1,77 @@
+'''
+Results file of predict.py
+	- packing results of each order joined back onto the order's input rows at its first row, in one merge
+	- written as Excel, CSV or Parquet (by file extension), CSV & Parquet can be appended to chunk by chunk as orders complete
+'''
+import os
+
+import pandas as pd
+
+
+RESULT_COLS = ["time_taken", "num_containers", "used_containers", "Container-wise packing-info"]
+DROP_COLS = ["ITEM_NAME","DESCRIPTION", "UNIT_HEIGHT (Inches)", "UNIT_LENGTH (Inches)", "UNIT_WIDTH (Inches)", "UNIT_WEIGHT (LBs)", "UNIT_VOLUME (Cubic Feet)"]
+
+
+def results_frame(order_rows, results):
+	'''
+	order_rows: input rows of each order, indexed by row number in the input file
+	results   : [proc_id, time_taken, num_containers, used_containers, container-wise packing-info] of each order, same order as order_rows
+	rows in input file order, results filled in at each order's first row only
+	'''
+	rows = pd.concat(order_rows)
+	first_rows = [order_df.index[0] for order_df in order_rows]
+	packing = pd.DataFrame({"time_taken"                 :[result[1] for result in results],
+							"num_containers"             :[result[2] for result in results],
+							"used_containers"            :[str(result[3]) for result in results],
+							"Container-wise packing-info":[result[4] for result in results]}, index=first_rows)
+
+	rows = rows.drop(columns=RESULT_COLS + DROP_COLS, errors="ignore").join(packing).sort_index()
+	rows["num_containers"] = rows["num_containers"].astype("float64") # blank on all but the first row of an order
+	return rows
+
+
+class ResultWriter():
+	def __init__(self, path):
+		'''
+		path: results file, .xlsx | .csv | .parquet
+		'''
+		self.path = path
+		self.format = os.path.splitext(path)[1].lower().lstrip(".")
+		if self.format not in ("xlsx", "csv", "parquet"):
+			raise ValueError("unsupported results file type {}".format(path))
+
+		self.frames = [] # Excel can't be appended to, so gets written on close()
+		self.parquet_writer = None
+		self.num_rows = 0
+		if self.format == "parquet":
+			import pyarrow, pyarrow.parquet # only needed for parquet results, missing fails here rather than after packing the first chunk
+			self.pa, self.pq = pyarrow, pyarrow.parquet
+
+	def write(self, df):
+		if self.format == "xlsx":
+			self.frames.append(df)
+		elif self.format == "csv":
+			df.to_csv(self.path, mode="w" if self.num_rows == 0 else "a", header=self.num_rows == 0, index=False)
+		else:
+			if self.parquet_writer is None:
+				# columns blank throughout the first chunk have no type to go by, so they're text for the whole file like the object ones
+				self.text_cols = [col for col in df.columns if df[col].dtype == object or df[col].isna().all()]
+			df = df.assign(**{col: df[col].astype(str).where(df[col].notna(), None) for col in self.text_cols})
+			if self.parquet_writer is None:
+				table = self.pa.Table.from_pandas(df, preserve_index=False)
+				schema = self.pa.schema([field.with_type(self.pa.string()) if field.name in self.text_cols else field for field in table.schema],
+										metadata=table.schema.metadata)
+				table = table.cast(schema)
+				self.parquet_writer = self.pq.ParquetWriter(self.path, schema)
+			else:
+				table = self.pa.Table.from_pandas(df, schema=self.parquet_writer.schema, preserve_index=False)
+			self.parquet_writer.write_table(table)
+		self.num_rows += len(df)
+
+	def close(self):
+		if self.num_rows == 0 and len(self.frames) == 0: # no orders, results file with the columns only
+			self.write(pd.DataFrame(columns=RESULT_COLS))
+		if self.format == "xlsx" and len(self.frames) > 0:
+			pd.concat(self.frames).to_excel(self.path, index=False)
+		elif self.parquet_writer is not None:
+			self.parquet_writer.close()
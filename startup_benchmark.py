@@ -0,0 +1,82 @@
+'''
+Start-up time of a packing process, each measured in a fresh interpreter as a spawned worker would pay it
+	- import: importing predict.py
+	- heuristic: import + packing a small order with the heuristic only
+	- rl: import + packing an order RL packing triggers for, incl. importing torch & loading the model (skipped without a model)
+lists the heavy modules each run imported, appends the timings to --history to track them across changes
+'''
+import argparse, csv, json, os, statistics, subprocess, sys, time
+
+HEAVY_MODULES = ["torch", "pandas", "matplotlib", "joblib", "PIL", "imageio"]
+
+ORDERS = {
+	"heuristic": ([1, 2], [2, 1], [[10, 8, 3, 1], [5, 4, 2, 0.5]]),
+	# items heavier than half any container's max weight, one container each is more than config.rl_threshold_num_containers
+	"rl": ([1, 2, 3, 4, 5, 6, 7], [1, 1, 1, 1, 1, 1, 1], [[10, 8, 6, 26], [10, 8, 5, 26], [9, 8, 6, 26], [9, 8, 5, 26], [8, 8, 6, 26], [8, 8, 5, 26], [8, 7, 5, 26]]),
+}
+
+RUN = '''
+import json, sys, time
+start = time.time()
+import numpy as np
+import predict
+imported = time.time()
+order = {order}
+if order is not None:
+	item_ids, order_qtys, item_dims = order
+	result = predict.pack_order_items(0, "startup_benchmark", np.array(item_ids), np.array(order_qtys), np.array(item_dims, dtype=np.float64), None)
+print(json.dumps({{"import":imported - start, "total":time.time() - start, "modules":[m for m in {heavy} if m in sys.modules],
+				  "num_containers":None if order is None else int(result[2])}}))
+'''
+
+
+def run_once(scenario):
+	code = RUN.format(order=repr(ORDERS.get(scenario)), heavy=repr(HEAVY_MODULES))
+	start = time.time()
+	out = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+	result = json.loads(out.stdout.strip().splitlines()[-1])
+	result["process"] = time.time() - start # incl. interpreter start-up
+	return result
+
+
+if __name__=="__main__":
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--repeats', type=int, default=5, help='fresh processes per scenario, median is reported')
+	parser.add_argument('--scenarios', default='import,heuristic,rl')
+	parser.add_argument('--history', default=None, help='csv file the medians get appended to')
+	parser.add_argument('--max_seconds', type=float, default=None, help='exit with 1 if the import scenario takes longer')
+
+	args = parser.parse_args()
+
+	import config
+	have_model = os.path.exists(os.path.join(config.epoch_dir, config.save_model_name))
+
+	rows = []
+	for scenario in args.scenarios.split(","):
+		if scenario == "rl" and not have_model:
+			print("rl: skipped, no model checkpoint in", config.epoch_dir)
+			continue
+
+		results = [run_once(scenario) for _ in range(args.repeats)]
+		row = {"time":time.strftime("%Y-%m-%d %H:%M:%S"), "scenario":scenario,
+			   "process_s":statistics.median(r["process"] for r in results),
+			   "import_s":statistics.median(r["import"] for r in results),
+			   "total_s":statistics.median(r["total"] for r in results),
+			   "heavy_modules":" ".join(results[0]["modules"])}
+		rows.append(row)
+		print("{}: process {:.3f}s, import predict {:.3f}s, import+packing {:.3f}s, heavy modules: {}, containers: {}".format(
+				scenario, row["process_s"], row["import_s"], row["total_s"], row["heavy_modules"] or "none", results[0]["num_containers"]))
+
+	if args.history is not None and len(rows) > 0:
+		new_file = not os.path.exists(args.history)
+		with open(args.history, "a", newline="") as f:
+			writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+			if new_file:
+				writer.writeheader()
+			writer.writerows(rows)
+
+	import_rows = [row for row in rows if row["scenario"] == "import"]
+	if args.max_seconds is not None and len(import_rows) > 0 and import_rows[0]["import_s"] > args.max_seconds:
+		print("import of predict.py took longer than", args.max_seconds, "s")
+		sys.exit(1)
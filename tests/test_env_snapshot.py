@@ -0,0 +1,80 @@
+import os, sys, copy
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pack_env.box import Box
+from pack_env.packingEnv import PackEnv
+
+
+def random_env(rng, num_boxes=10):
+    boxes = []
+    for i in range(num_boxes):
+        dx, dy, dz = sorted(rng.integers(1, 8, size=3).tolist(), reverse=True)
+        boxes.append(Box(dx=dx, dy=dy, dz=dz, wt=float(rng.uniform(0.1, 3)), name="b%d" % i, parent_gen="o"))
+    env = PackEnv(datagen_mode="predict", customer_order_list=boxes, init_container_ids_list=[6, 4, 2])
+    env.reset(check_print=False, mode_mcts_sim=False)
+    return env
+
+
+def random_steps(env, rng, num_steps):
+    for i in range(num_steps):
+        _, done, _ = env.step(int(rng.choice(np.flatnonzero(env.current_box_mask))), check_print=False, mode_mcts_sim=True)
+        if done:
+            return
+
+
+def env_state(env):
+    container_sets = env.container_sets_status
+    return {
+        "obs"       : env.observation(),
+        "mask"      : env.current_box_mask.copy(),
+        "counters"  : (env.current_box_id, env.packed_box_counter, sorted(env.used_containers), env.current_box.name, env.unpacked_wt, env.unpacked_vol),
+        "remaining" : env.remaining_counts.copy(),
+        "boxes"     : [(b.name,) + b.pack_state() for b in env.boxSeqGenerator.box_list],
+        "containers": [(c.height_map.copy(), c.free_wt, c.free_vol, [b.name for b in c.boxes]) for c in container_sets.containers],
+        "placed"    : {name:[b.name for b in val["packed_boxes"]] for name, val in container_sets.container_placedBox_lookUp.items()},
+    }
+
+
+def assert_same(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        if key == "containers":
+            for (h1, w1, v1, n1), (h2, w2, v2, n2) in zip(a[key], b[key]):
+                assert np.array_equal(h1, h2) and (w1, v1, n1) == (w2, v2, n2)
+        elif isinstance(a[key], np.ndarray):
+            assert np.array_equal(a[key], b[key]), key
+        else:
+            assert a[key] == b[key], key
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_restore_undoes_steps(seed):
+    rng = np.random.default_rng(seed)
+    env = random_env(rng)
+    random_steps(env, rng, 3)
+    before = env_state(env)
+
+    for i in range(3): # each snapshot restored once, from the same state
+        state = env.snapshot()
+        random_steps(env, rng, 4)
+        env.restore(state)
+        assert_same(env_state(env), before)
+
+
+def test_restored_env_steps_like_a_copy():
+    rng = np.random.default_rng(0)
+    env = random_env(rng)
+    random_steps(env, rng, 2)
+    env_copy = copy.deepcopy(env)
+
+    state = env.snapshot()
+    random_steps(env, rng, 5)
+    env.restore(state)
+
+    for env_ in (env, env_copy):
+        random_steps(env_, np.random.default_rng(1), 4)
+    assert_same(env_state(env), env_state(env_copy))
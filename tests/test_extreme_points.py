@@ -0,0 +1,53 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pack_env.extreme_points import ExtremePointSet
+
+
+def test_insertion_order_right_deep_top():
+    corners = ExtremePointSet("insertion")
+    corners.add((0, 0, 0), corners.TOP)
+    corners.place_box(0, 0, 0, 4, 3, 2)
+    # right, deep & top corners of the first box, the corner it was placed at is gone
+    assert corners.ordered() == [(4, 0, 0), (0, 3, 0), (0, 0, 2)]
+
+    corners.place_box(4, 0, 0, 2, 2, 2)
+    assert corners.ordered() == [(6, 0, 0), (0, 3, 0), (4, 2, 0), (0, 0, 2), (4, 0, 2)]
+
+
+def test_duplicate_corner_kept_once_at_earliest_position():
+    corners = ExtremePointSet("insertion")
+    corners.add((1, 1, 1), corners.TOP)
+    corners.add((2, 2, 2), corners.DEEP)
+    corners.add((1, 1, 1), corners.RIGHT)
+    assert len(corners) == 2
+    assert corners.ordered() == [(1, 1, 1), (2, 2, 2)]
+
+
+def test_lowest_z_order():
+    corners = ExtremePointSet("lowest_z")
+    for point in [(0, 0, 3), (5, 1, 0), (2, 4, 0), (1, 4, 0)]:
+        corners.add(point, corners.TOP)
+    assert corners.ordered() == [(1, 4, 0), (2, 4, 0), (5, 1, 0), (0, 0, 3)]
+
+
+def test_used_corner_never_added_again():
+    corners = ExtremePointSet("insertion")
+    corners.add((0, 0, 0), corners.TOP)
+    corners.place_box(0, 0, 0, 2, 2, 2)
+    corners.add((0, 0, 0), corners.RIGHT)
+    assert (0, 0, 0) not in corners
+
+
+@pytest.mark.parametrize("drop_covered", [False, True])
+def test_covered_corners_dropped_only_if_asked(drop_covered):
+    corners = ExtremePointSet("insertion", drop_covered=drop_covered)
+    corners.add((2, 0, 0), corners.RIGHT)
+    corners.place_box(0, 0, 0, 4, 4, 4) # covers (2, 0, 0)
+    corners.add((1, 1, 1), corners.TOP) # inside the box
+    assert ((2, 0, 0) in corners) != drop_covered
+    assert ((1, 1, 1) in corners) != drop_covered
+    assert (4, 0, 0) in corners # on the surface, never covered
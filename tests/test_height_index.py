@@ -0,0 +1,65 @@
+import os, sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pack_env.height_index import HeightMapIndex
+
+
+def random_footprint(rng, X, Y):
+    dx, dy = rng.integers(1, X+1), rng.integers(1, Y+1)
+    return rng.integers(0, X-dx+1), rng.integers(0, Y-dy+1), dx, dy
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_queries_match_slicing_after_random_drops(seed):
+    rng = np.random.default_rng(seed)
+    X, Y = 13, 9
+    hmap = np.zeros((16, 12)) # larger than the indexed region, like a container's map
+    index = HeightMapIndex(hmap, X, Y)
+
+    for drop in range(40):
+        # queried before the drop too, so tables built earlier get patched
+        for query in range(10):
+            x, y, dx, dy = random_footprint(rng, X, Y)
+            assert index.max_height(x, y, dx, dy) == hmap[x:x+dx, y:y+dy].max()
+            level = hmap[x, y]
+            assert index.area_at(level, x, y, dx, dy) == np.sum(hmap[x:x+dx, y:y+dy] == level)
+
+        x, y, dx, dy = random_footprint(rng, X, Y)
+        before = hmap[x:x+dx, y:y+dy].max()
+        h = float(rng.integers(1, 6))
+        assert index.fill(x, y, dx, dy, before + h) == before + h
+        assert np.all(hmap[x:x+dx, y:y+dy] == before + h)
+
+
+def test_grid_queries_match_single_queries():
+    rng = np.random.default_rng(0)
+    hmap = np.zeros((12, 8))
+    index = HeightMapIndex(hmap)
+    for drop in range(15):
+        index.fill(*random_footprint(rng, 12, 8), float(rng.integers(1, 4)))
+
+    for dx, dy in [(1, 1), (3, 2), (5, 7), (12, 8)]:
+        max_h = index.max_height_grid(dx, dy)
+        area = index.area_at_grid(max_h, dx, dy)
+        for x in range(12-dx+1):
+            for y in range(8-dy+1):
+                assert max_h[x, y] == hmap[x:x+dx, y:y+dy].max()
+                assert area[x, y] == np.sum(hmap[x:x+dx, y:y+dy] == max_h[x, y])
+
+
+def test_snapshot_tables_stay_valid():
+    hmap = np.zeros((6, 6))
+    index = HeightMapIndex(hmap)
+    index.max_height(0, 0, 4, 4)
+    saved_map, saved_tables = hmap.copy(), index.get_tables()
+
+    index.fill(1, 1, 2, 2, 3.)
+    assert index.max_height(0, 0, 4, 4) == 3.
+
+    hmap[...] = saved_map
+    index.set_tables(saved_tables)
+    assert index.max_height(0, 0, 4, 4) == 0.
@@ -0,0 +1,71 @@
+import os, sys, math, copy, random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from pack_env.box import Box
+from pack_env.packingHeuristic import PackHeuristic
+
+
+def order_items(rows):
+    # rows: (length, width, height, weight, qty) => items_info & boxes as predict.pack_order_items makes them
+    items_info = []
+    for i, (a, b, c, wt, qty) in enumerate(rows):
+        for j in range(qty):
+            l, w, h = sorted([a, b, c], reverse=True)
+            items_info.append([l, w, h, math.ceil(l), math.ceil(w), math.ceil(h), wt, "ItemID_%d_Num_%d" % (i, j+1), "ORDER_ID_o", [a, b, c]])
+    boxes = [Box(dx=item[0], dy=item[1], dz=item[2], wt=item[6], name=item[7], parent_gen=item[8], orig_size=item[9], orig_intXY_sort_size=tuple(item[:3]))
+             for item in items_info]
+    return items_info, boxes
+
+
+@pytest.mark.parametrize("single_sku", [True, False])
+def test_empty_order(monkeypatch, single_sku):
+    monkeypatch.setattr(config, "single_sku_heuristic", single_sku)
+    packed, container_ids, container_names, packing_info, container_wise_packing = PackHeuristic([], []).check_packing()
+    assert packed
+    assert container_ids == [] and container_names == []
+
+
+def test_single_sku_packs_every_item(monkeypatch):
+    monkeypatch.setattr(config, "single_sku_heuristic", True)
+    items_info, boxes = order_items([(6.5, 4.2, 2.1, 0.5, 40)])
+    packed, container_ids, container_names, packing_info, container_wise_packing = PackHeuristic(items_info, boxes).check_packing()
+    assert packed
+    assert sum(len(packing["packed_boxes"]) for packing in packing_info.values()) == 40
+
+
+def repack_prefixes(px, ids):
+    # reference for extend_packing: each next item kept if check_packing_single_container packs all kept items + it from scratch
+    kept, packing = [], None
+    for item_id in ids:
+        packed, packing_info = px.check_packing_single_container([px.items_info[j] for j in kept + [item_id]], [copy.deepcopy(px.input_box_list[j]) for j in kept + [item_id]])
+        if packed:
+            kept.append(item_id)
+            packing = packing_info
+    return kept, packing
+
+
+def placements(packing_info):
+    return {name:[(b.name, b.x, b.y, b.z, b.pack_rot) for b in packing["packed_boxes"]] for name, packing in packing_info.items()}
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_extend_packing_matches_repacking_prefixes(seed):
+    rng = random.Random(seed)
+    rows = [(rng.uniform(1, 14), rng.uniform(1, 10), rng.uniform(.5, 8), rng.uniform(.1, 8), rng.randint(1, 5)) for i in range(rng.randint(2, 5))]
+    items_info, boxes = order_items(rows)
+    ids = list(range(len(items_info)))
+
+    kept, packing = repack_prefixes(PackHeuristic(items_info, copy.deepcopy(boxes)), ids)
+
+    px = PackHeuristic(items_info, boxes)
+    search = px.init_packing_search()
+    last = None
+    for item_id in ids:
+        pack_info = px.extend_packing(search, item_id)
+        last = pack_info if pack_info is not None else last
+    assert search["ids"] == kept
+    assert placements(last) == placements(packing)
@@ -0,0 +1,43 @@
+import os, sys, copy, pickle
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from pack_env.box import Box
+from pack_env.packingEnv import PackEnv
+
+
+def order_env():
+    sizes = [(6, 4, 3, 2.), (5, 4, 2, 1.), (4, 3, 2, 1.), (3, 3, 1, .5), (3, 2, 1, .5)]
+    boxes = [Box(dx=dx, dy=dy, dz=dz, wt=wt, name="b%d" % i, parent_gen="o") for i, (dx, dy, dz, wt) in enumerate(sizes)]
+    env = PackEnv(datagen_mode="predict", customer_order_list=boxes, init_container_ids_list=[6, 4])
+    env.reset(check_print=False, mode_mcts_sim=False)
+    return env
+
+
+def first_valid(env):
+    return int(np.flatnonzero(env.current_box_mask)[0])
+
+
+def assert_same_obs(a, b):
+    for x, y in zip(a if isinstance(a, tuple) else (a,), b if isinstance(b, tuple) else (b,)):
+        assert np.array_equal(x, y)
+
+
+@pytest.mark.parametrize("compact_obs", [False, True])
+@pytest.mark.parametrize("clone", [copy.deepcopy, lambda env: pickle.loads(pickle.dumps(env))])
+def test_cloned_env_keeps_patching_its_observation(monkeypatch, compact_obs, clone):
+    monkeypatch.setattr(config, "compact_obs", compact_obs)
+    env, reference = order_env(), order_env()
+    env.step(first_valid(env), check_print=False, mode_mcts_sim=False)
+    env = clone(env)
+    reference.step(first_valid(reference), check_print=False, mode_mcts_sim=False)
+
+    for i in range(2):
+        action = first_valid(reference)
+        env.step(action, check_print=False, mode_mcts_sim=False)
+        reference.step(action, check_print=False, mode_mcts_sim=False)
+        assert_same_obs(env.current_obs, reference.current_obs)
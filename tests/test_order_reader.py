@@ -0,0 +1,56 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pd = pytest.importorskip("pandas")
+
+import order_reader
+
+
+def item_master():
+    return pd.DataFrame({"ITEM_ID":[1, 2, 3, 3], "UNIT_LENGTH (Inches)":[4., 5., 6., 9.], "UNIT_WIDTH (Inches)":[3., 4., 5., 9.],
+                         "UNIT_HEIGHT (Inches)":[2., 3., 4., 9.], "UNIT_WEIGHT (LBs)":[1., 2., 3., 9.]})
+
+
+def write(df, path):
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    elif path.endswith(".parquet"):
+        df.to_parquet(path, index=False, row_group_size=3) # row groups don't line up with orders or chunks either
+    else:
+        df.to_json(path, orient="records", lines=True)
+
+
+def read(path, **kwargs):
+    return {order_id:rows for order_id, rows in order_reader.iter_orders(path, item_master(), chunk_rows=2, **kwargs)}
+
+
+@pytest.mark.parametrize("ext", ["csv", "parquet", "jsonl"])
+def test_orders_split_across_chunks(tmp_path, ext):
+    # rows of order "a" & "b" interleaved over several chunks of 2 rows
+    df = pd.DataFrame({"ORDER_ID":["a", "b", "a", "c", "b", "a", "c"], "ITEM_ID":[1, 2, 3, 1, 1, 2, 3], "ORDER_QTY":[1, 2, 3, 4, 5, 6, 7]})
+    path = str(tmp_path / ("orders." + ext))
+    write(df, path)
+
+    orders = read(path)
+    assert sorted(orders) == ["a", "b", "c"]
+    for order_id, rows in orders.items():
+        expected = df[df["ORDER_ID"] == order_id]
+        assert rows.index.tolist() == expected.index.tolist() # row numbers in the file
+        assert rows["ORDER_QTY"].tolist() == expected["ORDER_QTY"].tolist()
+
+    item_ids, qtys, dims = order_reader.order_arrays(orders["a"])
+    assert item_ids.tolist() == [1, 3, 2] and qtys.tolist() == [1, 3, 6]
+    assert dims.tolist() == [[4., 3., 2., 1.], [6., 5., 4., 3.], [5., 4., 3., 2.]] # first row of a duplicate item master ITEM_ID
+
+
+def test_sorted_input_orders_come_out_while_reading(tmp_path):
+    df = pd.DataFrame({"ORDER_ID":[7, 7, 7, 8, 9, 9], "ITEM_ID":[1, 2, 3, 1, 2, 3], "ORDER_QTY":[1, 1, 1, 2, 2, 2]})
+    path = str(tmp_path / "orders.csv")
+    write(df, path)
+
+    orders = order_reader.iter_orders(path, item_master(), sorted_input=True, chunk_rows=2)
+    order_id, rows = next(orders)
+    assert order_id == "7" and len(rows) == 3
+    assert [(order_id, len(rows)) for order_id, rows in orders] == [("8", 1), ("9", 2)]
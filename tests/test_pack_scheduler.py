@@ -0,0 +1,94 @@
+import os, sys, time, json, asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import predict
+from pack_scheduler import PackScheduler
+
+
+RL_SECONDS = 0.3
+
+
+def fake_pack_orders(orders, frozen_model=False, packing_cache=None, use_rl=True, deadline=None, keep_heuristic=False, heuristic=None):
+    # heuristic packing in 3 containers right away, RL packing in 2 after RL_SECONDS; order "single" can't be improved on
+    proc_id, order_id = orders[0][:2]
+    if not use_rl:
+        return [[proc_id, .01, 3, ["BOX(1)", "BOX(2)", "BOX(3)"], "heuristic", None if order_id == "single" else "heuristic packing"]]
+    assert heuristic == "heuristic packing" # packed again only by RL, from the heuristic packing
+    time.sleep(RL_SECONDS)
+    return [[proc_id, RL_SECONDS, 2, ["BOX(1)", "BOX(2)"], "rl"]]
+
+
+def payload(proc_id, order_id):
+    return (proc_id, order_id, np.array([1, 2]), np.array([1, 1]), np.ones((2, 4)))
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(predict, "pack_orders", fake_pack_orders)
+    monkeypatch.setattr(config, "ORDER_DEADLINE_GRACE", .1)
+    with ThreadPoolExecutor(4) as executor:
+        yield PackScheduler(executor, budget=None)
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_provisional_heuristic_comes_before_rl_result(scheduler):
+    events = []
+    start = time.time()
+    result = run(scheduler.pack(payload(0, "o"), budget=5, on_provisional=lambda r: events.append((time.time() - start, r[2]))))
+    assert events[0][0] < RL_SECONDS and events[0][1] == 3 # heuristic, handed out before RL finished
+    assert result[2] == 2 and len(result) == 5
+
+
+def test_heuristic_kept_when_rl_runs_past_deadline(scheduler):
+    events = []
+    result = run(scheduler.pack(payload(0, "o"), budget=.05, on_provisional=events.append))
+    assert [r[2] for r in events] == [3]
+    assert result[2] == 3
+
+
+def test_no_provisional_for_orders_rl_cant_improve(scheduler):
+    events = []
+    result = run(scheduler.pack(payload(0, "single"), budget=5, on_provisional=events.append))
+    assert events == [] and result[2] == 3
+
+
+def test_service_streams_provisional_then_final(scheduler):
+    pytest.importorskip("flask")
+    pytest.importorskip("pandas")
+    from pack_service import PackingService
+
+    service = PackingService.__new__(PackingService) # without item master & worker pool
+    service.scheduler = scheduler
+    events = list(service.pack_stream([payload(0, "o"), payload(1, "single")], [5, 5]))
+
+    assert [(status, r["order_id"]) for status, r in events if r["order_id"] == "o"] == [("provisional", "o"), ("final", "o")]
+    assert [(status, r["num_containers"]) for status, r in events if r["order_id"] == "single"] == [("final", 3)]
+    assert [r["num_containers"] for status, r in events if r["order_id"] == "o"] == [3, 2]
+    assert events[-1] == ("final", dict(events[-1][1], order_id="o")) # the RL packing comes last
+
+
+def test_pack_endpoint_streams_json_lines(scheduler):
+    pytest.importorskip("flask")
+    pytest.importorskip("pandas")
+    from pack_service import PackingService, create_app
+
+    service = PackingService.__new__(PackingService)
+    service.scheduler, service.item_master = scheduler, {}
+    items = [{"item_id":1, "qty":1, "length":4, "width":3, "height":2, "weight":1}, {"item_id":2, "qty":1, "length":5, "width":4, "height":3, "weight":2}]
+    response = create_app(service).test_client().post("/pack", json={"order_id":"o", "items":items, "budget_s":5, "provisional":True})
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(line["status"], line["num_containers"]) for line in lines] == [("provisional", 3), ("final", 2)]
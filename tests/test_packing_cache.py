@@ -0,0 +1,52 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pack_env.box import Box, BoxArray
+from packing_cache import PackingCache
+
+
+def order(names, size=(4., 3., 2.), wt=1.):
+    # items_info, boxes & BoxArray of an order of identical items, placed side by side in one container
+    items_info = [[size[0], size[1], size[2], 4, 3, 2, wt, name, "ORDER_ID_o", list(size)] for name in names]
+    boxes = [Box(x=4*i, y=0, z=0, dx=size[0], dy=size[1], dz=size[2], wt=wt, name=name) for i, name in enumerate(names)]
+    order_boxes = BoxArray.from_order([len(names)], [list(size) + [wt]])
+    return items_info, {"BOX(1)":{"container_id":3, "packed_boxes":boxes}}, order_boxes
+
+
+def test_put_get_with_own_item_names(tmp_path):
+    cache = PackingCache(str(tmp_path / "cache.sqlite"))
+    items_info, packing_info, order_boxes = order(["a_1", "a_2"])
+    assert cache.get(items_info, order_boxes, 1) is None
+    cache.put(items_info, order_boxes, 1, packing_info)
+
+    repeat_info, _, repeat_boxes = order(["b_1", "b_2"])
+    num_containers, container_names, container_wise_packing = cache.get(repeat_info, repeat_boxes, 1)
+    assert num_containers == 1
+    assert container_names == str(["BOX(1)"])
+    assert "b_1 Pos:" in container_wise_packing and "b_2 Pos:" in container_wise_packing
+    assert "a_1" not in container_wise_packing
+
+
+def test_message_of_order_that_cant_be_packed(tmp_path):
+    cache = PackingCache(str(tmp_path / "cache.sqlite"))
+    items_info, _, order_boxes = order(["a_1"])
+    cache.put(items_info, order_boxes, 1, message="Can't be packed")
+    assert cache.get(items_info, order_boxes, 1) == [0, "[]", "Can't be packed"]
+
+
+def test_key_covers_rows_and_items(tmp_path):
+    cache = PackingCache(str(tmp_path / "cache.sqlite"))
+    items_info, packing_info, order_boxes = order(["a_1", "a_2"])
+    cache.put(items_info, order_boxes, 1, packing_info)
+    assert cache.get(items_info, order_boxes, 2) is None # same items split over 2 rows
+
+    other_info, _, other_boxes = order(["a_1", "a_2"], wt=2.)
+    assert cache.get(other_info, other_boxes, 1) is None
+
+
+def test_sqlite_failure_is_a_miss(tmp_path):
+    cache = PackingCache(str(tmp_path / "missing_dir" / "cache.sqlite"))
+    items_info, packing_info, order_boxes = order(["a_1"])
+    cache.put(items_info, order_boxes, 1, packing_info) # doesn't raise
+    assert cache.get(items_info, order_boxes, 1) is None
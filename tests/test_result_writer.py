@@ -0,0 +1,59 @@
+import os, sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pd = pytest.importorskip("pandas")
+
+import result_writer
+
+
+def order_rows():
+    # input rows of 2 orders at their row numbers in the input file, order "b" read first
+    a = pd.DataFrame({"ORDER_ID":["a", "a"], "ITEM_ID":[1, 2], "ORDER_QTY":[1, 3], "ITEM_NAME":["x", "y"]}, index=[0, 2])
+    b = pd.DataFrame({"ORDER_ID":["b"], "ITEM_ID":[5], "ORDER_QTY":[2], "ITEM_NAME":["z"]}, index=[1])
+    return [b, a], [[1, .5, 1, ["BOX(1)"], "BOX(1)<= ..."], [0, np.nan, 0, [], "Some unexpected error"]]
+
+
+def read(path):
+    return pd.read_csv(path) if path.endswith(".csv") else pd.read_parquet(path)
+
+
+def test_results_frame_fills_first_row_of_each_order():
+    rows, results = order_rows()
+    df = result_writer.results_frame(rows, results)
+    assert df["ORDER_ID"].tolist() == ["a", "b", "a"] # input file order
+    assert "ITEM_NAME" not in df.columns
+    assert df["num_containers"].tolist()[:2] == [0., 1.] and np.isnan(df["num_containers"].iloc[2])
+    assert df["used_containers"].tolist()[:2] == ["[]", str(["BOX(1)"])]
+
+
+@pytest.mark.parametrize("ext", ["csv", "parquet"])
+def test_chunks_written_in_one_file(tmp_path, ext):
+    path = str(tmp_path / ("results." + ext))
+    rows, results = order_rows()
+    writer = result_writer.ResultWriter(path)
+    writer.write(result_writer.results_frame(rows[:1], results[:1]))
+    writer.write(result_writer.results_frame(rows[1:], results[1:])) # blank & text columns after a first chunk without them
+    writer.close()
+
+    df = read(path)
+    assert df["ORDER_ID"].tolist() == ["b", "a", "a"]
+    assert df["ORDER_QTY"].tolist() == [2, 1, 3]
+    assert df["num_containers"].tolist()[:2] == [1., 0.] and np.isnan(df["num_containers"].iloc[2])
+    assert df["Container-wise packing-info"].tolist()[:2] == ["BOX(1)<= ...", "Some unexpected error"]
+    assert pd.isna(df["used_containers"].iloc[2])
+
+
+@pytest.mark.parametrize("ext", ["csv", "parquet"])
+def test_no_orders_gives_columns_only(tmp_path, ext):
+    path = str(tmp_path / ("results." + ext))
+    result_writer.ResultWriter(path).close()
+    df = read(path)
+    assert len(df) == 0 and df.columns.tolist() == result_writer.RESULT_COLS
+
+
+def test_unsupported_file_type(tmp_path):
+    with pytest.raises(ValueError):
+        result_writer.ResultWriter(str(tmp_path / "results.txt"))
@@ -0,0 +1,56 @@
+import os, sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+torch = pytest.importorskip("torch")
+
+import config
+import predict
+from mcts.parallel import RootParallelMCTS
+from model_arch.model import NNetWrapper
+from model_arch.net import CNNPro
+from pack_env.box import Box
+from pack_env.packingEnv import PackEnv
+
+
+def order_env():
+    sizes = [(12, 9, 5, 3.), (10, 8, 4, 2.), (9, 6, 3, 1.5), (7, 5, 2, 1.)]
+    boxes = [Box(dx=dx, dy=dy, dz=dz, wt=wt, name="b%d" % i, parent_gen="o") for i, (dx, dy, dz, wt) in enumerate(sizes)]
+    env = PackEnv(datagen_mode="predict", customer_order_list=boxes, init_container_ids_list=[14, 6, 4])
+    env.reset(check_print=False, mode_mcts_sim=False)
+    return env
+
+
+@pytest.fixture(scope="module")
+def search():
+    torch.manual_seed(0)
+    np.random.seed(0)
+    model = NNetWrapper(CNNPro())
+    model.prepare_inference(device="cpu", num_threads=1)
+    search = RootParallelMCTS(model, 2)
+    yield search
+    search.close()
+
+
+@pytest.mark.parametrize("sim_times", [config.simulation_times, 1])
+def test_root_children_get_visits(search, sim_times):
+    env = order_env()
+    search.reset(env, config.search_depth)
+    for i in range(2):
+        action = search.select_action(sim_times)
+        assert sum(search.visits.values()) > 0
+        assert search.visits[action] == max(search.visits.values())
+        env.step(action, check_print=False, mode_mcts_sim=False)
+        search.succeed(action)
+
+
+def test_root_workers_leave_each_tree_simulations(monkeypatch):
+    monkeypatch.setattr(config, "mcts_root_workers", 8)
+    monkeypatch.setattr(config, "simulation_times", 3)
+    assert predict.root_workers() == 1
+    monkeypatch.setattr(config, "simulation_times", 8)
+    assert predict.root_workers() == 4
+    monkeypatch.setattr(config, "mcts_root_workers", 1)
+    assert predict.root_workers() == 1
@@ -0,0 +1,61 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcts.monteCarlo import state_key
+from pack_env.box import Box
+from pack_env.packingEnv import PackEnv
+
+
+CONTAINER_ID = 2 # 18 x 13 x 7
+
+
+def order_env(sizes):
+    boxes = [Box(dx=dx, dy=dy, dz=dz, wt=wt, name="b%d" % i, parent_gen="o") for i, (dx, dy, dz, wt) in enumerate(sizes)]
+    env = PackEnv(datagen_mode="predict", customer_order_list=boxes, init_container_ids_list=[CONTAINER_ID])
+    env.reset(check_print=False, mode_mcts_sim=False)
+    return env
+
+
+def action(env, x, y):
+    # unrotated placement at (x, y) of the order's container
+    return [a for a, placement in env.actionId_lookUp.items() if placement == (CONTAINER_ID, 0, x, y)][0]
+
+
+def pack(env, positions):
+    for x, y in positions:
+        a = action(env, x, y)
+        assert env.current_box_mask[a] == 1
+        env.step(a, check_print=False, mode_mcts_sim=False)
+    return env
+
+
+def test_same_state_by_different_action_orders():
+    sizes = [(4, 3, 2, 1.), (4, 3, 2, 1.), (5, 4, 3, 2.)]
+    env1 = pack(order_env(sizes), [(0, 0), (8, 0)])
+    env2 = pack(order_env(sizes), [(8, 0), (0, 0)])
+    assert state_key(env1) == state_key(env2)
+
+
+def test_different_placements_give_different_keys():
+    sizes = [(4, 3, 2, 1.), (4, 3, 2, 1.), (5, 4, 3, 2.)]
+    env1 = pack(order_env(sizes), [(0, 0), (8, 0)])
+    env2 = pack(order_env(sizes), [(0, 0), (4, 0)])
+    assert state_key(env1) != state_key(env2)
+
+
+def test_different_remaining_boxes_give_different_keys():
+    env1 = pack(order_env([(4, 3, 2, 1.), (4, 3, 2, 1.), (5, 4, 3, 2.)]), [(0, 0)])
+    env2 = pack(order_env([(4, 3, 2, 1.), (4, 3, 2, 1.), (6, 4, 3, 2.)]), [(0, 0)])
+    assert env1.current_box.dx == env2.current_box.dx # same current box, only the boxes after it differ
+    assert state_key(env1) != state_key(env2)
+
+
+def test_key_restored_with_snapshot():
+    env = order_env([(4, 3, 2, 1.), (4, 3, 2, 1.), (5, 4, 3, 2.)])
+    key = state_key(env)
+    state = env.snapshot()
+    pack(env, [(0, 0)])
+    assert state_key(env) != key
+    env.restore(state)
+    assert state_key(env) == key
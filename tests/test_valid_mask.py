@@ -0,0 +1,71 @@
+import os, sys, copy
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pack_env.box import Box
+from pack_env.packingEnv import PackEnv
+
+
+def reference_mask(container_sets, box, container_ids):
+    # per (x, y) check of each distinct orientation of a rotated copy of box, as get_valid_mask did before it was vectorized
+    mask = np.zeros((container_sets.num_containers, container_sets.num_rotations, container_sets.max_X, container_sets.max_Y), dtype=np.int8)
+    box_dims = sorted([box.dx, box.dy, box.dz], reverse=True)
+    for container_id in container_ids:
+        container = container_sets.containers[container_id]
+        container_dims = sorted([container.dx, container.dy, container.dz], reverse=True)
+        if any(c < b for c, b in zip(container_dims, box_dims)) or container.free_wt < box.wt or container.free_vol < box.vol():continue
+
+        for rotation, _ in box.rotation_table():
+            b = copy.deepcopy(box)
+            b.rotate(rotation)
+            if (b.dx > container.dx) or (b.dy > container.dy) or (b.dz > container.dz):continue
+            for y in range(container.dy - b.dy + 1):
+                for x in range(container.dx - b.dx + 1):
+                    if np.sum(mask) >= 1000:break
+                    if container.check_box_placement_valid(b, (x, y)) >= 0:
+                        mask[container_id, rotation, x, y] = 1
+    return mask
+
+
+def random_env(rng, num_boxes):
+    boxes = []
+    for i in range(num_boxes):
+        dx, dy, dz = sorted(rng.integers(1, 9, size=3).tolist(), reverse=True)
+        boxes.append(Box(dx=dx, dy=dy, dz=dz, wt=float(rng.uniform(0.1, 3)), name="b%d" % i, parent_gen="o"))
+    env = PackEnv(datagen_mode="predict", customer_order_list=boxes, init_container_ids_list=[14, 6, 4, 2])
+    env.reset(check_print=False, mode_mcts_sim=False)
+    return env
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_mask_matches_per_position_reference(seed):
+    rng = np.random.default_rng(seed)
+    env = random_env(rng, 12)
+    container_sets = env.container_sets_status
+    done = False
+    while not done:
+        box = env.current_box
+        mask = container_sets.get_valid_mask(box, env.init_container_ids_list, [0, 1, 2, 3])
+        assert np.array_equal(mask, reference_mask(container_sets, box, env.init_container_ids_list))
+
+        valid = np.flatnonzero(env.current_box_mask)
+        _, done, _ = env.step(int(rng.choice(valid)), check_print=False, mode_mcts_sim=False)
+
+
+@pytest.mark.parametrize("dims, rotations", [((4, 4, 4), [0]), ((5, 3, 3), [0, 1, 2]), ((5, 5, 2), [0, 2, 3]), ((6, 4, 2), [0, 1, 2, 3])])
+def test_equal_orientations_masked_once(dims, rotations):
+    box = Box(dx=dims[0], dy=dims[1], dz=dims[2], wt=1., name="b", parent_gen="o")
+    assert [rotation for rotation, _ in box.rotation_table()] == rotations
+    for rotation, oriented in box.rotation_table():
+        rotated = copy.deepcopy(box)
+        rotated.rotate(rotation)
+        assert oriented == (rotated.dx, rotated.dy, rotated.dz)
+
+    env = PackEnv(datagen_mode="predict", customer_order_list=[box], init_container_ids_list=[0]) # 12 x 12 x 12, fewer placements than the mask cap
+    env.reset(check_print=False, mode_mcts_sim=False)
+    mask = env.container_sets_status.get_valid_mask(env.current_box, [0], [0, 1, 2, 3])
+    assert sorted(set(np.nonzero(mask)[1].tolist())) == rotations
+    assert (env.current_box.dx, env.current_box.dy, env.current_box.dz) == dims # mask built without rotating the box